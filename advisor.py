@@ -0,0 +1,62 @@
+import math
+
+import endgame
+from endgame import Solution
+from planner import BITS_PER_TURN, Plan, estimate_turns
+from state import State
+from utility import Hand
+
+"""
+Submit advisor: whether to guess the opponent's hand now or keep asking questions.
+The posterior over the candidates follows `State.calc_case` (a hand with one green 5 counts twice
+when I hold no 5s), and its normalizer is carried over by every narrowing, so the advice costs only the top-k hands.
+
+Guessing now wins with the probability of the most likely hand. Asking wins if the opponent does not identify
+my hand during the expected turns we still need, the opponent identifying it in each turn with probability
+`1 / (opponent's turns + 1)`, where the opponent's turns are estimated from their candidates of my hand
+(see `State.num_opponent_candidates`). The advice is the larger of the two.
+The expected turns come from the endgame solver when it has a solution, then from the planner, then are estimated.
+"""
+
+TOP_K = 5
+
+
+def estimate_opponent_turns(num_candidates: float) -> float:
+    """Same as `planner.estimate_turns` for the (averaged, so possibly fractional) number of candidates"""
+    if num_candidates <= 1:
+        return 0.0
+    return max(1.0, math.log2(num_candidates) / BITS_PER_TURN)
+
+
+class SubmitAdvice:
+    def __init__(self, top: list[tuple[Hand, float]], expected_turns: float, source: str, opponent_turns: float):
+        self.top = top
+        # probability of winning by submitting the most likely hand now
+        self.win_probability = top[0][1] if len(top) > 0 else 0.0
+        # expected turns to identify the hand by questions; `source` is "endgame", "planner" or "estimate"
+        self.expected_turns = expected_turns
+        self.source = source
+        # expected turns of the opponent to identify my hand
+        self.opponent_turns = opponent_turns
+        # probability that the opponent has not identified my hand once we have identified theirs
+        self.keep_probability = (1 - 1 / (opponent_turns + 1)) ** expected_turns
+
+    def should_submit(self) -> bool:
+        return self.win_probability >= self.keep_probability
+
+    def __repr__(self):
+        return (
+            f"SubmitAdvice<win {self.win_probability:.3f}, expected turns {self.expected_turns:.3f}, "
+            f"keep {self.keep_probability:.3f}>"
+        )
+
+
+def advise(state: State, plan: Plan | None = None, solution: Solution | None = None, k: int = TOP_K) -> SubmitAdvice:
+    """`solution` is used below `endgame.ENDGAME_THRESHOLD` candidates, then `plan`, then an estimate"""
+    top = state.most_likely(k)
+    opponent_turns = estimate_opponent_turns(state.num_opponent_candidates)
+    if solution is not None and state.num_candidates() <= endgame.ENDGAME_THRESHOLD:
+        return SubmitAdvice(top, solution.expected_turns, "endgame", opponent_turns)
+    if plan is not None:
+        return SubmitAdvice(top, plan.expected_turns, "planner", opponent_turns)
+    return SubmitAdvice(top, estimate_turns(state.candidates), "estimate", opponent_turns)
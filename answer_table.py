@@ -0,0 +1,150 @@
+import collections
+import threading
+from typing import Hashable
+
+import profiling
+import utility
+from qanda import Question
+from universe import QuestionKey, Universe, get_universe
+from utility import Hand
+
+"""
+`AnswerTable` holds the answer of every question for every candidate hand of a game.
+Answers are encoded into small integers (`qanda.Answer.code`),
+so partitioning candidates by a question is a table lookup instead of calling `Question.ask`.
+The answers are in the `Universe` of all hands shared by every game,
+and the table selects the hands disjoint from my hand and weights them.
+Candidates are referred to by their index in `AnswerTable.masks`, which holds packed hands (see `utility`).
+A set of candidates is a bitset (an `int` whose bit `i` stands for the `i`-th hand).
+The inverted index maps each (question, answer code) to the bitset of hands giving that answer,
+so narrowing is a single AND and counting candidates is a popcount.
+
+Partitions are memoized in `PartitionCache`, keyed by the candidate bitset and the question.
+The table (and so the cache) is shared by all states of a game, and the cache may be filled from a background thread.
+"""
+
+PARTITION_CACHE_SIZE = 4096
+
+
+class Partition:
+    """Candidates grouped by the answer code, with the size and the total weight of each group"""
+
+    def __init__(self, groups: dict[int, int], sizes: dict[int, int], cases: dict[int, int]):
+        self.groups = groups
+        self.sizes = sizes
+        self.cases = cases
+        self.entropy = utility.calc_entropy(list(cases.values())) if len(cases) > 0 else 0.0
+        self.max_size = max(sizes.values(), default=0)
+
+
+class PartitionCache:
+    def __init__(self, maxsize: int = PARTITION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries: collections.OrderedDict[Hashable, Partition] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Partition | None:
+        with self.lock:
+            partition = self.entries.get(key)
+            if partition is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return partition
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def put(self, key: Hashable, partition: Partition) -> None:
+        with self.lock:
+            self.entries[key] = partition
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class AnswerTable:
+    @profiling.timed("candidates")
+    def __init__(self, hand: Hand, universe: Universe | None = None):
+        self.own_hand = hand
+        self.universe = get_universe() if universe is None else universe
+        self.cache = PartitionCache()
+        hand_mask = hand.mask()
+        self.all = self.universe.disjoint_from(hand_mask)
+        # a hand with one green 5 can be made of either 5 when both are left to the opponent
+        one_five = self.universe.with_tile[10] & ~self.universe.with_tile[11]
+        self.double_weight = one_five if hand_mask & utility.FIVES_MASK == 0 else 0
+        self.own_position = self.universe.positions[hand_mask]
+
+    def __reduce__(self):
+        return (AnswerTable, (self.own_hand, self.universe))
+
+    @property
+    def masks(self):
+        return self.universe.masks
+
+    @property
+    def columns(self):
+        return self.universe.columns
+
+    @property
+    def index(self) -> dict[QuestionKey, dict[int, int]]:
+        return self.universe.index
+
+    def __len__(self):
+        return len(self.masks)
+
+    def hand(self, idx: int) -> Hand:
+        return Hand.from_mask(self.masks[idx])
+
+    def column(self, question: Question):
+        return self.columns[question.key()]
+
+    def case(self, idx: int) -> int:
+        return 2 if self.double_weight >> idx & 1 else 1
+
+    def weight(self, bits: int) -> int:
+        return bits.bit_count() + (bits & self.double_weight).bit_count()
+
+    def narrow(self, bits: int, question: Question, code: int) -> int:
+        return bits & self.index[question.key()].get(code, 0)
+
+    def revealed_by(self, question: Question) -> int:
+        """Bitset of the hands (over the whole universe) giving the same answer to the question as my hand"""
+        codes = self.index[question.key()]
+        return codes[self.column(question)[self.own_position]]
+
+    def groupby(self, bits: int, question_key: QuestionKey) -> dict[int, int]:
+        groups: dict[int, int] = dict()
+        for code, answer_bits in self.index[question_key].items():
+            group = bits & answer_bits
+            if group:
+                groups[code] = group
+        return groups
+
+    def entropies(self, bits: int, question_keys: list[QuestionKey]) -> list[float]:
+        """Entropies of many questions over the same candidates, bypassing the cache (for lookahead)"""
+        entropies = []
+        for question_key in question_keys:
+            cases = [self.weight(bits & answer_bits) for answer_bits in self.index[question_key].values() if bits & answer_bits]
+            entropies.append(utility.calc_entropy(cases) if len(cases) > 0 else 0.0)
+        return entropies
+
+    @profiling.timed("partition")
+    def partition(self, bits: int, question: Question) -> Partition:
+        # questions are hashable and equal by key, so questions of different card objects share entries
+        key = (bits, question)
+        partition = self.cache.get(key)
+        if partition is None:
+            groups = self.groupby(bits, question.key())
+            sizes = {code: group.bit_count() for code, group in groups.items()}
+            cases = {code: self.weight(group) for code, group in groups.items()}
+            partition = Partition(groups, sizes, cases)
+            self.cache.put(key, partition)
+        return partition
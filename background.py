@@ -0,0 +1,117 @@
+import concurrent.futures
+import threading
+import weakref
+from typing import Callable
+
+import deck_ranking
+import endgame
+from answer_table import QuestionKey
+from deck_ranking import DeckAwareScore
+from endgame import Solution
+from planner import MAX_DEPTH, Plan, Planner
+from state import State
+
+"""
+Background computation of the question ranking while the prompt is waiting for input.
+As soon as a new state is pushed, a worker thread fills the partition cache for every possible question,
+so the dashboard renders from the cache, then solves the endgame (below `endgame.ENDGAME_THRESHOLD` candidates),
+computes the deck-aware ranking (if enabled)
+and runs the planner (if enabled) publishing the plan of each depth.
+Work for a state is abandoned as soon as a newer state is pushed.
+
+Each published result (and an exception raised by the worker) is notified to the listener,
+so the prompt waiting for input redraws its frame (see `ui.live`).
+An exception is kept on the future of the state and shown by the dashboard instead of the pending results.
+"""
+
+BACKGROUND_PLAN_BUDGET = 30.0
+
+
+class BackgroundRanker:
+    def __init__(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.planner: Planner | None = None
+        self.plans: weakref.WeakKeyDictionary[State, Plan] = weakref.WeakKeyDictionary()
+        self.solutions: weakref.WeakKeyDictionary[State, Solution | None] = weakref.WeakKeyDictionary()
+        self.deck_aware = False
+        self.deck_scores: weakref.WeakKeyDictionary[State, dict[QuestionKey, DeckAwareScore]] = weakref.WeakKeyDictionary()
+        self.cancelled = threading.Event()
+        self.futures: weakref.WeakKeyDictionary[State, concurrent.futures.Future] = weakref.WeakKeyDictionary()
+        self.listener: Callable[[State], None] | None = None
+        # held while notifying, so no redraw is running once the listener is removed
+        self.listener_lock = threading.Lock()
+
+    def submit(self, state: State) -> None:
+        self.cancelled.set()
+        cancelled = self.cancelled = threading.Event()
+        future = self.futures[state] = self.executor.submit(self.rank, state, self.planner, cancelled)
+        future.add_done_callback(lambda future: self.notify_error(state, future, cancelled))
+
+    def set_listener(self, listener: Callable[[State], None] | None) -> None:
+        with self.listener_lock:
+            self.listener = listener
+
+    def notify(self, state: State, cancelled: threading.Event) -> None:
+        with self.listener_lock:
+            if self.listener is not None and not cancelled.is_set():
+                self.listener(state)
+
+    def notify_error(self, state: State, future: concurrent.futures.Future, cancelled: threading.Event) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            self.notify(state, cancelled)
+
+    def rank(self, state: State, planner: Planner | None, cancelled: threading.Event) -> None:
+        for question in state.possible_questions():
+            if cancelled.is_set():
+                return
+            state.partition(question)
+        if 1 < state.num_candidates() <= endgame.ENDGAME_THRESHOLD and state not in self.solutions:
+            solution = endgame.solve(state, endgame.ENDGAME_BUDGET, cancelled)
+            if cancelled.is_set():
+                return
+            # None when not even the search of depth 1 completed
+            self.solutions[state] = solution
+            self.notify(state, cancelled)
+        if self.deck_aware and state not in self.deck_scores:
+            scores = deck_ranking.deck_aware_scores(state, cancelled)
+            if scores is None:
+                return
+            self.deck_scores[state] = scores
+            self.notify(state, cancelled)
+        known = self.plans.get(state)
+        if planner is not None and (known is None or known.depth < MAX_DEPTH):
+            planner.plan(
+                state, BACKGROUND_PLAN_BUDGET, on_progress=lambda plan: self.publish(state, plan, cancelled), cancelled=cancelled
+            )
+
+    def publish(self, state: State, plan: Plan, cancelled: threading.Event) -> None:
+        self.plans[state] = plan
+        self.notify(state, cancelled)
+
+    def plan_for(self, state: State) -> Plan | None:
+        """The deepest plan found so far, or None if not available yet"""
+        return self.plans.get(state)
+
+    def solution_for(self, state: State) -> tuple[bool, Solution | None]:
+        """Whether the endgame search has finished, and its solution (None if not even depth 1 was searched in time)"""
+        return (state in self.solutions, self.solutions.get(state))
+
+    def error_for(self, state: State) -> BaseException | None:
+        """The exception raised by the background work for the state, if any"""
+        future = self.futures.get(state)
+        if future is None or not future.done() or future.cancelled():
+            return None
+        return future.exception()
+
+    def deck_scores_for(self, state: State) -> dict[QuestionKey, DeckAwareScore] | None:
+        """The deck-aware ranking, or None if not available yet"""
+        return self.deck_scores.get(state)
+
+    def cancel(self) -> None:
+        """Abandons the running work and waits until the worker thread is idle"""
+        self.cancelled.set()
+        self.executor.submit(lambda: None).result()
+
+    def shutdown(self) -> None:
+        self.cancelled.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
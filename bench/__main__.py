@@ -0,0 +1,99 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import vectorized
+from answer_table import AnswerTable
+from bench.scenarios import Scenario
+from game import Game
+from state import State
+from universe import get_universe
+
+"""
+Headless benchmarks over reproducible scenarios, reported as JSON.
+Run from the repository root (next to `questions.json`):
+
+    $ poetry run python -m bench --seeds 10 > bench_output.txt
+"""
+
+
+def rank_all(state: State) -> None:
+    for question in state.possible_questions():
+        state.partition(question)
+
+
+def bench_scenario(seed: int) -> tuple[dict[str, list[float]], int]:
+    """The timings of the scenario by name, and the number of its actions"""
+    timings: dict[str, list[float]] = dict()
+
+    def record(name: str, start: float):
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+
+    scenario = Scenario(seed)
+    # the universe is loaded once beforehand (see `main`), so this is the selection of the hand's candidates
+    start = time.perf_counter()
+    AnswerTable(scenario.hand)
+    record("answer_table", start)
+    start = time.perf_counter()
+    game = Game(State(scenario.hand), background=False)
+    record("initial_state", start)
+
+    start = time.perf_counter()
+    for action in scenario.play(game):
+        record(action, start)
+        state = game.current_state()
+        state.table.cache.clear()
+        start = time.perf_counter()
+        rank_all(state)
+        record("ranking_cold", start)
+        start = time.perf_counter()
+        rank_all(state)
+        record("ranking_warm", start)
+        start = time.perf_counter()
+    return timings, len(game.history) - 1
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    return {
+        "count": len(values),
+        "total": sum(values),
+        "mean": statistics.mean(values),
+        "median": statistics.median(values),
+        "max": max(values),
+    }
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Headless benchmarks reported as JSON")
+    parser.add_argument("--seeds", type=int, default=5, help="number of scenarios (seeds 0, 1, ...)")
+    parser.add_argument("--first-seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    get_universe()
+    universe_load = time.perf_counter() - start
+    merged: dict[str, list[float]] = dict()
+    scenarios = []
+    for seed in range(args.first_seed, args.first_seed + args.seeds):
+        timings, actions = bench_scenario(seed)
+        scenarios.append(
+            {"seed": seed, "actions": actions, "timings": {name: summarize(values) for name, values in timings.items()}}
+        )
+        for name, values in timings.items():
+            merged.setdefault(name, []).extend(values)
+    report = {
+        "python": platform.python_version(),
+        "numpy": vectorized.available(),
+        "universe": universe_load,
+        "summary": {name: summarize(values) for name, values in merged.items()},
+        "scenarios": scenarios,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,61 @@
+import random
+
+from game import Game
+from qanda import Answer, Question, QuestionType
+from simulate import deal_hands
+from state import State
+
+"""
+Reproducible game scenarios driving `State` and `Game` without the TTY.
+A scenario deals both hands and draws question cards at random from its seed,
+and answers questions from the dealt (hidden) opponent's hand.
+"""
+
+NUM_INITIAL_FIELD_CARDS = 6
+
+
+def best_question(state: State) -> Question:
+    return max(state.possible_questions(), key=state.calc_entropy)
+
+
+class Scenario:
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.hand, self.opponent_hand = deal_hands(self.rng)
+
+    def answer(self, question: Question) -> Answer:
+        return Answer(question.type, question.ask(self.opponent_hand))
+
+    def add_random_card(self, game: Game) -> None:
+        deck = game.current_state().question_cards_in_deck
+        if len(deck) > 0:
+            game.add_question_card(self.rng.randrange(len(deck)))
+
+    def play(self, game: Game, max_turns: int = 20):
+        """
+        Scripted turns: add the initial field cards, then alternately
+        ask the best question by entropy and let the opponent ask a random one; a card is added after each question.
+        Yields after every action so that the caller can time it.
+        """
+        for _ in range(NUM_INITIAL_FIELD_CARDS):
+            self.add_random_card(game)
+            yield "add_question_card"
+        for _ in range(max_turns):
+            state = game.current_state()
+            if state.num_candidates() <= 1 or len(state.question_cards_in_field) == 0:
+                return
+            question = best_question(state)
+            game.narrow_by_qa(question, self.answer(question))
+            yield "narrow_by_qa"
+            self.add_random_card(game)
+            yield "add_question_card"
+            questions = game.current_state().possible_questions()
+            if len(questions) == 0:
+                continue
+            question = self.rng.choice(questions)
+            answer = self.answer(question) if question.type == QuestionType.SHARED else None
+            game.opponent_ask(question, answer)
+            yield "opponent_ask"
+            self.add_random_card(game)
+            yield "add_question_card"
@@ -0,0 +1,69 @@
+import json
+import os
+import pickle
+
+from qanda import QuestionCard, QuestionCardId
+
+"""
+Registry of the question cards in `questions.json`.
+The file is parsed and validated against `QuestionCardId` once per process, and every state shares the same
+`QuestionCard` instances, which are never modified (so cards can be compared by identity).
+The validated data is also cached in a pickle next to the source, invalidated by the source's mtime and size,
+so later processes skip parsing the JSON.
+"""
+
+QUESTIONS_PATH = "questions.json"
+CACHE_VERSION = 1
+
+CardData = tuple[str, str, str]  # id, ja, en
+
+
+class InvalidQuestionCards(Exception):
+    pass
+
+
+def cache_path(path: str) -> str:
+    return path + ".cache"
+
+
+def parse(path: str) -> list[CardData]:
+    with open(path) as f:
+        raw_question_data = json.load(f)
+    ids = [data["id"] for data in raw_question_data]
+    unknown = set(ids) - {qcid.value for qcid in QuestionCardId}
+    if unknown:
+        raise InvalidQuestionCards(f"unknown question cards in {path}: {', '.join(sorted(unknown))}")
+    if len(set(ids)) != len(ids):
+        raise InvalidQuestionCards(f"duplicated question cards in {path}")
+    return [(data["id"], data["ja"], data["en"]) for data in raw_question_data]
+
+
+def load_data(path: str) -> list[CardData]:
+    stat = os.stat(path)
+    signature = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    try:
+        with open(cache_path(path), "rb") as f:
+            cached_signature, data = pickle.load(f)
+        if cached_signature == signature:
+            return data
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        pass
+    data = parse(path)
+    try:
+        with open(cache_path(path) + ".tmp", "wb") as f:
+            pickle.dump((signature, data), f)
+        os.replace(cache_path(path) + ".tmp", cache_path(path))
+    except OSError:
+        pass  # e.g. read-only directory; parse again next time
+    return data
+
+
+_registry: dict[str, tuple[QuestionCard, ...]] = dict()
+
+
+def question_cards(path: str = QUESTIONS_PATH) -> tuple[QuestionCard, ...]:
+    """The shared question cards of the file"""
+    key = os.path.abspath(path)
+    if key not in _registry:
+        _registry[key] = tuple(QuestionCard(QuestionCardId(qcid), ja, en) for qcid, ja, en in load_data(path))
+    return _registry[key]
@@ -0,0 +1,41 @@
+import json
+import pathlib
+from typing import Callable
+
+import pytest
+
+import cards
+from qanda import QuestionCard, QuestionCardId
+from state import State
+from tests.helpers import parse_hand
+
+"""
+Shared fixtures of the tests in `tests/`.
+`questions.json` is not needed: the cards are loaded from a generated file with placeholder texts.
+"""
+
+
+@pytest.fixture(scope="session")
+def questions_path(tmp_path_factory) -> pathlib.Path:
+    path = tmp_path_factory.mktemp("cards") / cards.QUESTIONS_PATH
+    path.write_text(json.dumps([{"id": qcid.value, "ja": qcid.value, "en": qcid.value} for qcid in QuestionCardId]))
+    return path
+
+
+@pytest.fixture(scope="session")
+def question_cards(questions_path) -> tuple[QuestionCard, ...]:
+    return cards.question_cards(str(questions_path))
+
+
+@pytest.fixture
+def make_state(question_cards) -> Callable[..., State]:
+    """`make_state("1r 2b 5 7b 9r", "count_red", ...)` is a new game with the given cards in the field"""
+
+    def make(hand: str, *field: str) -> State:
+        state = State(parse_hand(hand), question_cards_in_deck=question_cards)
+        for qcid in field:
+            ids = [card.id.value for card in state.question_cards_in_deck]
+            state = state.add_question_card(ids.index(qcid))
+        return state
+
+    return make
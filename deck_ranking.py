@@ -0,0 +1,61 @@
+import threading
+
+from answer_table import QuestionKey
+from qanda import QuestionCard
+from state import State
+
+"""
+Deck-aware ranking of the questions in the field.
+After a question is asked, its card is trashed and a random card of the deck is added to the field,
+so a question is worth its entropy now plus the expected entropy of the best question of the next turn,
+averaged over the answers (the groups of candidates) and over the card drawn from the deck.
+For each group, the entropy of every question of the field and the deck is computed once in a batch,
+and the best follow-up for each drawn card is a max over them.
+"""
+
+
+class DeckAwareScore:
+    def __init__(self, entropy: float, follow_up: float):
+        self.entropy = entropy
+        # expected entropy of the best question on the next turn
+        self.follow_up = follow_up
+
+    @property
+    def total(self) -> float:
+        return self.entropy + self.follow_up
+
+    def __repr__(self):
+        return f"DeckAwareScore<{self.entropy:.3f} + {self.follow_up:.3f}>"
+
+
+def card_keys(cards: tuple[QuestionCard, ...]) -> list[list[QuestionKey]]:
+    return [[question.key() for question in card.to_questions()] for card in cards]
+
+
+def follow_up_entropy(state: State, group: int, field: list[list[QuestionKey]], deck: list[list[QuestionKey]]) -> float:
+    """Expected entropy of the best question over the group, when a random card of the deck is added to the field"""
+    keys = [key for keys in field + deck for key in keys]
+    entropies = dict(zip(keys, state.table.entropies(group, keys)))
+    best_in_field = max((entropies[key] for keys in field for key in keys), default=0.0)
+    if len(deck) == 0:
+        return best_in_field
+    return sum(max(best_in_field, *(entropies[key] for key in keys)) for keys in deck) / len(deck)
+
+
+def deck_aware_scores(state: State, cancelled: threading.Event | None = None) -> dict[QuestionKey, DeckAwareScore] | None:
+    """Returns None if cancelled"""
+    deck = card_keys(state.question_cards_in_deck)
+    scores: dict[QuestionKey, DeckAwareScore] = dict()
+    for card in state.question_cards_in_field:
+        field = card_keys(tuple(qc for qc in state.question_cards_in_field if qc is not card))
+        for question in card.to_questions():
+            partition = state.partition(question)
+            total = sum(partition.cases.values())
+            follow_up = 0.0
+            for code, group in partition.groups.items():
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                if partition.sizes[code] > 1:
+                    follow_up += follow_up_entropy(state, group, field, deck) * partition.cases[code] / total
+            scores[question.key()] = DeckAwareScore(partition.entropy, follow_up)
+    return scores
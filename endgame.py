@@ -0,0 +1,287 @@
+import math
+import threading
+import time
+import weakref
+
+from answer_table import AnswerTable, QuestionKey
+from planner import BudgetExceeded, card_questions, estimate_turns, search_keys
+from qanda import Question, QuestionCardId
+from state import State
+
+"""
+Endgame solver: the question policy minimizing the expected number of turns to identify the opponent's hand,
+with the candidates weighted by `State.calc_case` and the replacement card drawn uniformly from the deck.
+It is run below `ENDGAME_THRESHOLD` candidates (automatically, by the background ranker) within a time budget.
+
+The search is iterative deepening: a search of depth d asks at most d more questions, the remaining turns being
+estimated as in the planner, and depths increase until a search completes without being cut at its depth,
+which gives the exact value. When the budget runs out, the deepest completed search is returned.
+When no question can be asked at all, the remaining turns are estimated too, so even a complete search
+is only exact if no such position is reached.
+
+Values are memoized in a transposition table keyed by canonical positions, shared by all searches of a game.
+A card whose questions do not split the candidates never does for fewer candidates, so such cards are only counted
+as spares in a position, and positions differing only in which cards are spare share their entry.
+An entry cut at its depth is only reused at the same depth; an entry which was not is reused at any larger depth.
+
+The search is branch and bound: every value is bounded below by the entropy of the candidates
+divided by the bits of the widest question (and by 1 turn), so a question or a draw is pruned
+as soon as its partial value plus the bounds of the rest reaches the best value found so far.
+A search called with a `cutoff` returns either the value (below the cutoff) or a lower bound (not below it).
+
+Questions which do not split the candidates are only considered when no question does, to cycle the field.
+"""
+
+ENDGAME_THRESHOLD = 100
+ENDGAME_BUDGET = 2.0
+TABLE_LIMIT = 1_000_000
+
+# (candidates, field card ids, number of spare field cards, deck card ids, number of spare deck cards)
+Position = tuple[int, frozenset[QuestionCardId], int, frozenset[QuestionCardId], int]
+
+# flags of a value: a leaf was cut at the search depth / estimated because no question could be asked
+CUT = 1
+ESTIMATED = 2
+
+
+class Solution:
+    def __init__(self, question: Question, expected_turns: float, depth: int, flags: int):
+        self.question = question
+        self.expected_turns = expected_turns
+        # the depth of the deepest completed search
+        self.depth = depth
+        self.flags = flags
+
+    def exact(self) -> bool:
+        return self.flags == 0
+
+    def complete(self) -> bool:
+        """Whether the search was not cut at its depth"""
+        return not self.flags & CUT
+
+    def __repr__(self):
+        return f"Solution<{self.question}, expected turns {self.expected_turns:.3f}, depth {self.depth}>"
+
+
+# (value, flags, depth of the search)
+Entry = tuple[float, int, int]
+
+
+class TranspositionTable:
+    def __init__(self):
+        self.exact: dict[Position, Entry] = dict()
+        self.lower: dict[Position, Entry] = dict()
+        # cards splitting the candidates
+        self.useful: dict[int, frozenset[QuestionCardId]] = dict()
+
+    def __len__(self):
+        return len(self.exact) + len(self.lower) + len(self.useful)
+
+    def clear(self) -> None:
+        self.exact.clear()
+        self.lower.clear()
+        self.useful.clear()
+
+
+_transpositions: weakref.WeakKeyDictionary[AnswerTable, TranspositionTable] = weakref.WeakKeyDictionary()
+
+
+class EndgameSolver:
+    def __init__(
+        self,
+        table: AnswerTable,
+        card_questions: dict[QuestionCardId, list[QuestionKey]],
+        deadline: float,
+        cancelled: threading.Event | None = None,
+    ):
+        self.table = table
+        self.card_questions = card_questions
+        self.deadline = deadline
+        self.cancelled = cancelled
+        self.transpositions = _transpositions.setdefault(table, TranspositionTable())
+        if len(self.transpositions) > TABLE_LIMIT:
+            self.transpositions.clear()
+        max_branches = max(len(codes) for codes in table.index.values())
+        self.bits_per_turn = math.log2(max(2, max_branches))
+        # flags of the values computed since the last reset (see `value`)
+        self.flags = 0
+
+    def lower_bound(self, candidates: int) -> float:
+        if candidates.bit_count() <= 1:
+            return 0.0
+        # entropy of the weights, which are 1 or 2
+        total = self.table.weight(candidates)
+        doubled = candidates & self.table.double_weight
+        entropy = math.log2(total) - 2 * doubled.bit_count() / total
+        return max(1.0, entropy / self.bits_per_turn)
+
+    def partition(self, candidates: int, question_key: QuestionKey) -> list[tuple[int, int]]:
+        groups = [(group, self.table.weight(group)) for group in self.table.groupby(candidates, question_key).values()]
+        return sorted(groups, key=lambda item: -item[1])
+
+    def splits(self, candidates: int, card: QuestionCardId) -> bool:
+        for question_key in self.card_questions[card]:
+            for answer_bits in self.table.index[question_key].values():
+                group = candidates & answer_bits
+                if group:
+                    if group != candidates:
+                        return True
+                    break
+        return False
+
+    def useful_cards(self, candidates: int) -> frozenset[QuestionCardId]:
+        useful = self.transpositions.useful.get(candidates)
+        if useful is None:
+            useful = frozenset(card for card in self.card_questions if self.splits(candidates, card))
+            self.transpositions.useful[candidates] = useful
+        return useful
+
+    def canonical(self, position: Position) -> Position:
+        """Moves the cards which no longer split the candidates (nor any subset of them) to the spare counts"""
+        candidates, field, field_spares, deck, deck_spares = position
+        useful = self.useful_cards(candidates)
+        useful_field = field & useful
+        useful_deck = deck & useful
+        return (
+            candidates,
+            useful_field,
+            field_spares + len(field) - len(useful_field),
+            useful_deck,
+            deck_spares + len(deck) - len(useful_deck),
+        )
+
+    def lookup(self, entries: dict[Position, Entry], position: Position, depth: int) -> Entry | None:
+        entry = entries.get(position)
+        if entry is None:
+            return None
+        _, flags, searched_depth = entry
+        if searched_depth == depth or (not flags & CUT and searched_depth <= depth):
+            return entry
+        return None
+
+    def value(self, position: Position, cutoff: float, depth: int) -> float:
+        """Expected turns from the position, asking at most `depth` more questions; sets the flags of the value"""
+        if position[0].bit_count() <= 1:
+            return 0.0
+        position = self.canonical(position)
+        candidates, field, field_spares, deck, deck_spares = position
+        exact = self.lookup(self.transpositions.exact, position, depth)
+        if exact is not None:
+            self.flags |= exact[1]
+            return exact[0]
+        bound = self.lower_bound(candidates)
+        lower = self.lookup(self.transpositions.lower, position, depth)
+        if lower is not None and lower[0] > bound:
+            bound = lower[0]
+            self.flags |= lower[1]
+        if bound >= cutoff:
+            return bound
+        if time.time() > self.deadline or (self.cancelled is not None and self.cancelled.is_set()):
+            raise BudgetExceeded
+        stuck = len(field) == 0 and (field_spares == 0 or len(deck) + deck_spares == 0)
+        if stuck or depth == 0:
+            # a leaf: no question can be asked, or the search is cut at its depth
+            flags = ESTIMATED if stuck else CUT
+            best = max(bound, estimate_turns(candidates))
+            self.transpositions.exact[position] = (best, flags, depth)
+            self.flags |= flags
+            return best
+        outer_flags, self.flags = self.flags, 0
+        best = cutoff
+        if len(field) > 0:
+            questions = [
+                (self.partition(candidates, question_key), card)
+                for card in field
+                for question_key in self.card_questions[card]
+            ]
+            # the most informative questions first, for early cutoffs
+            questions.sort(key=lambda question: sum(weight * math.log2(weight) for _, weight in question[0]))
+            for groups, card in questions:
+                if len(groups) > 1:
+                    next_position = (candidates, field - {card}, field_spares, deck, deck_spares)
+                    best = min(best, self.question_value(groups, next_position, best, depth))
+        else:
+            # ask a question telling nothing, only to draw a new card
+            next_position = (candidates, field, field_spares - 1, deck, deck_spares)
+            best = self.question_value([(candidates, self.table.weight(candidates))], next_position, best, depth)
+        entry = (best, self.flags, depth)
+        if best < cutoff:
+            self.transpositions.exact[position] = entry
+        else:
+            self.transpositions.lower[position] = entry
+        self.flags |= outer_flags
+        return best
+
+    def question_value(self, groups: list[tuple[int, int]], next_position: Position, cutoff: float, depth: int) -> float:
+        """
+        Expected turns when asking the question partitioning the candidates into `groups`, this turn included;
+        `next_position` is the position after the asked card is trashed, with any of the groups as candidates
+        """
+        total = sum(weight for _, weight in groups)
+        bounds = [self.lower_bound(group) for group, _ in groups]
+        value = 1.0 + sum(bound * weight / total for bound, (_, weight) in zip(bounds, groups))
+        for bound, (group, weight) in zip(bounds, groups):
+            if value >= cutoff:
+                return value
+            if bound == 0.0:
+                continue
+            probability = weight / total
+            rest = value - probability * bound
+            next_cutoff = (cutoff - rest) / probability
+            value = rest + probability * self.draw_value((group, *next_position[1:]), next_cutoff, depth - 1)
+        return value
+
+    def draw_value(self, position: Position, cutoff: float, depth: int) -> float:
+        """Expected turns after a random card of the deck is added to the field"""
+        candidates, field, field_spares, deck, deck_spares = position
+        num_cards = len(deck) + deck_spares
+        if num_cards == 0:
+            return self.value(position, cutoff, depth)
+        draws = [((candidates, field | {card}, field_spares, deck - {card}, deck_spares), 1) for card in deck]
+        if deck_spares > 0:
+            # the cards which do not split the candidates are all alike
+            draws.append(((candidates, field, field_spares + 1, deck, deck_spares - 1), deck_spares))
+        bound = self.lower_bound(candidates)
+        value = bound
+        for next_position, count in draws:
+            if value >= cutoff:
+                return value
+            probability = count / num_cards
+            rest = value - probability * bound
+            value = rest + probability * self.value(next_position, (cutoff - rest) / probability, depth)
+        return value
+
+
+def solve(state: State, budget: float = ENDGAME_BUDGET, cancelled: threading.Event | None = None) -> Solution | None:
+    """
+    Returns the solution of the deepest search completed within the budget, exact if `Solution.exact()`;
+    None if not even a search of depth 1 completes or the search is cancelled
+    """
+    questions = state.possible_questions()
+    if len(questions) == 0 or state.num_candidates() <= 1:
+        return None
+    solver = EndgameSolver(state.table, card_questions(state), time.time() + budget, cancelled)
+    candidates, field, deck = search_keys(state)
+    # the most informative questions first, for early cutoffs
+    questions.sort(key=lambda question: -state.calc_entropy(question))
+    solution: Solution | None = None
+    depth = 1
+    while solution is None or not solution.complete():
+        if time.time() > solver.deadline:
+            break
+        best: Solution | None = None
+        solver.flags = 0
+        for question in questions:
+            groups = solver.partition(candidates, question.key())
+            cutoff = math.inf if best is None else best.expected_turns
+            try:
+                value = solver.question_value(groups, (candidates, field - {question.key()[0]}, 0, deck, 0), cutoff, depth)
+            except BudgetExceeded:
+                return None if cancelled is not None and cancelled.is_set() else solution
+            if value < cutoff:
+                best = Solution(question, value, depth, 0)
+        assert best is not None
+        best.flags = solver.flags
+        solution = best
+        depth += 1
+    return solution
@@ -1,14 +1,23 @@
+import advisor
+import profiling
 import ui
+from background import BackgroundRanker
+from planner import Planner
 from qanda import Answer, Question
 from state import State
 
 
 class Game:
-    def __init__(self, initial_state: State):
+    def __init__(self, initial_state: State, background: bool = True, profile_dir: str | None = None):
         self.history = [initial_state]
         self.future: list[State] = []
         self.message = ""
         self.show_all_candidates = False
+        self.planner: Planner | None = None
+        self.ranker = BackgroundRanker() if background else None
+        # each command is profiled into this directory if set
+        self.profile_dir = profile_dir
+        self.rank_in_background()
 
     def current_state(self):
         return self.history[-1]
@@ -16,20 +25,65 @@ class Game:
     def set_message(self, new_message=""):
         self.message = new_message
 
-    def narrow_by_qa(self, question: Question, answer: Answer):
-        next_state = self.current_state().narrow_by_qa(question, answer)
+    def rank_in_background(self) -> None:
+        if self.ranker is not None:
+            self.ranker.submit(self.current_state())
+
+    def push(self, next_state: State) -> None:
         self.history.append(next_state)
         self.future = []
+        self.rank_in_background()
+
+    def narrow_by_qa(self, question: Question, answer: Answer):
+        self.push(self.current_state().narrow_by_qa(question, answer))
 
     def add_question_card(self, idx: int) -> None:
-        next_state = self.current_state().add_question_card(idx)
-        self.history.append(next_state)
-        self.future = []
+        self.push(self.current_state().add_question_card(idx))
 
     def opponent_ask(self, question: Question, answer: Answer | None):
-        next_state = self.current_state().opponent_ask(question, answer)
-        self.history.append(next_state)
-        self.future = []
+        self.push(self.current_state().opponent_ask(question, answer))
+
+    def undo(self) -> bool:
+        if len(self.history) <= 1:
+            return False
+        self.future.append(self.history.pop())
+        self.rank_in_background()
+        return True
+
+    def redo(self) -> bool:
+        if len(self.future) == 0:
+            return False
+        self.history.append(self.future.pop())
+        self.rank_in_background()
+        return True
+
+    def toggle_planner(self) -> None:
+        if self.ranker is not None:
+            # the background ranking may be using the planner
+            self.ranker.cancel()
+        if self.planner is None:
+            self.planner = Planner(self.current_state())
+        else:
+            self.planner.shutdown()
+            self.planner = None
+        if self.ranker is not None:
+            self.ranker.planner = self.planner
+        self.rank_in_background()
+
+    def toggle_deck_aware(self) -> bool:
+        """Returns whether the deck-aware ranking is enabled; it needs the background ranker"""
+        if self.ranker is None:
+            return False
+        self.ranker.deck_aware = not self.ranker.deck_aware
+        self.rank_in_background()
+        return self.ranker.deck_aware
+
+    def finish(self) -> None:
+        if self.ranker is not None:
+            self.ranker.shutdown()
+        if self.planner is not None:
+            self.planner.shutdown()
+            self.planner = None
 
     """
     You can execute specific commands interactively through the shell-like interface.
@@ -48,9 +102,17 @@ class Game:
     -- `question` : Ask a question and obtain information
     -- `add` : Add the specified card in the deck to the field
     -- `opponent` : Opponent asks a question (Obtain info if shared-type one is choosen)
+    -- `submit` : Show the most likely hands of the opponent and whether to submit one now
     - Advanced commands
+    -- `what_if` : Show the candidates and the best next question for each possible answer to a question
     -- `show_all` : Toggle show_all switch;
         if True, the dashboard shows all candidates even if the number of them is greater than 10
+    -- `undo` : Go back to the state before the last action
+    -- `redo` : Redo the action undone by `undo`
+    -- `plan` : Toggle planner mode;
+        if True, `question` also shows the question chosen by the multi-turn lookahead planner
+    -- `deck` : Toggle deck-aware ranking;
+        if True, `question` also shows the expected entropy of the best question after the replacement draw
     - System commands
     -- `finish` : Finish the current game and quit the system
     -- `restart` : Finish the current game and start a new game
@@ -61,39 +123,61 @@ class Game:
             state = self.current_state()
             command = ui.input_command(state, self.message, self.show_all_candidates)
             if command == "finish":
+                self.finish()
                 return False
             elif command == "restart":
+                self.finish()
                 return True
             self.set_message()
-            if command == "":
-                continue
-            elif "question".startswith(command):
-                result = ui.qa(state, self.message, self.show_all_candidates)
-                if result is None:
-                    self.set_message("Cancelled `question`")
-                    continue
-                idx, question, answer = result
-                self.narrow_by_qa(question, answer)
-            elif "add".startswith(command):
-                idx: int | None = ui.add(state, self.message, self.show_all_candidates)
-                if idx is None:
-                    self.set_message("Cancelled `add`")
-                    continue
-                self.add_question_card(idx)
-            elif "opponent".startswith(command):
-                result = ui.opponent(state, self.message, self.show_all_candidates)
-                if result is None:
-                    self.set_message("Cancelled `opponent`")
-                    continue
-                idx, question, answer = result
-                self.opponent_ask(question, answer)
-            elif "submit".startswith(command):
-                print("`submit` is not implemented now")
-                pass
-            elif "show_all" == command:
-                self.show_all_candidates = not self.show_all_candidates
-            elif "undo".startswith(command):
-                print("`undo` is not implemented now")
-                pass
+            with profiling.profile_command(command, self.profile_dir):
+                self.execute(state, command)
+
+    def execute(self, state: State, command: str) -> None:
+        if command == "":
+            return
+        elif "question".startswith(command):
+            result = ui.qa(state, self.message, self.show_all_candidates, self.ranker)
+            if result is None:
+                self.set_message("Cancelled `question`")
+                return
+            idx, question, answer = result
+            self.narrow_by_qa(question, answer)
+        elif "add".startswith(command):
+            idx: int | None = ui.add(state, self.message, self.show_all_candidates)
+            if idx is None:
+                self.set_message("Cancelled `add`")
+                return
+            self.add_question_card(idx)
+        elif "opponent".startswith(command):
+            result = ui.opponent(state, self.message, self.show_all_candidates, self.ranker)
+            if result is None:
+                self.set_message("Cancelled `opponent`")
+                return
+            idx, question, answer = result
+            self.opponent_ask(question, answer)
+        elif "submit".startswith(command):
+            plan = self.ranker.plan_for(state) if self.ranker is not None else None
+            solution = self.ranker.solution_for(state)[1] if self.ranker is not None else None
+            ui.submit(state, advisor.advise(state, plan, solution), self.message, self.show_all_candidates)
+        elif "what_if" == command:
+            ui.what_if(state, self.message, self.show_all_candidates, self.ranker)
+        elif "show_all" == command:
+            self.show_all_candidates = not self.show_all_candidates
+        elif "plan" == command:
+            self.toggle_planner()
+            self.set_message(f"Planner mode: {'on' if self.planner else 'off'}")
+        elif "deck" == command:
+            self.set_message(f"Deck-aware ranking: {'on' if self.toggle_deck_aware() else 'off'}")
+        elif "undo".startswith(command):
+            last_action = self.current_state().last_action
+            if self.undo():
+                self.set_message(f"Undone: {last_action}")
+            else:
+                self.set_message("Nothing to undo")
+        elif "redo" == command:
+            if self.redo():
+                self.set_message(f"Redone: {self.current_state().last_action}")
             else:
-                pass
+                self.set_message("Nothing to redo")
+        else:
+            pass
@@ -1,11 +1,10 @@
-import itertools
-import os
+from typing import Iterator
 
+import screen
 from utility import Color, Hand, Tile
 
 
 def input_hand_print_help():
-    os.system("clear")
     print(
         """Example:
     - `1r` for red 1
@@ -15,35 +14,38 @@ def input_hand_print_help():
     )
 
 
+def parse_tile(tile_opt: str) -> Tile:
+    """Parses a tile such as `1r`, `2b` or `5`; raises `ValueError` with the reason if invalid"""
+    if len(tile_opt) < 1:
+        raise ValueError("Input length must be two (or one for tile `5`), please retry.")
+    if tile_opt[0] < "0" or "9" < tile_opt[0]:
+        raise ValueError("First character must be between `0` and `9`, please retry.")
+    num = int(tile_opt[0])
+    if num == 5:
+        return Tile(num, Color.GREEN)
+    if len(tile_opt) < 2:
+        raise ValueError("Input length must be two, please retry.")
+    color_opt = tile_opt[1].lower()
+    if color_opt not in ("r", "b"):
+        raise ValueError("Second character must be `r` or `b`, please retry.")
+    color = Color.RED if color_opt == "r" else Color.BLUE
+    return Tile(num, color)
+
+
 def input_tile():
     while True:
-        tile_opt = input("Input your tile: ")
-        if len(tile_opt) < 1:
-            print("Input length must be two (or one for tile `5`), please retry.")
-            continue
-        if tile_opt[0] < "0" or "9" < tile_opt[0]:
-            print("First character must be between `0` and `9`, please retry.")
-            continue
-        num = int(tile_opt[0])
-        if num == 5:
-            return Tile(num, Color.GREEN)
-        if len(tile_opt) < 2:
-            print("Input length must be two, please retry.")
-            continue
-        color_opt = tile_opt[1].lower()
-        if color_opt not in ("r", "b"):
-            print("Second character must be `r` or `b`, please retry.")
-            continue
-        color = Color.RED if color_opt == "r" else Color.BLUE
-        return Tile(num, color)
+        try:
+            return parse_tile(input("Input your tile: "))
+        except ValueError as e:
+            print(e)
 
 
 def input_hand():
     tiles: list[Tile] = []
     while len(tiles) < 5:
-        os.system("clear")
-        input_hand_print_help()
-        print(f"Current hand: {Hand(tiles)}")
+        with screen.frame():
+            input_hand_print_help()
+            print(f"Current hand: {Hand(tiles)}")
         tile = input_tile()
         if tile.num == 5:
             if sum(1 for tile in tiles if tile.num == 5) == 2:
@@ -73,29 +75,20 @@ def input_hand_with_retry():
                 continue
 
 
-def prepare_other_tiles(hand: Hand):
-    idx = 0
-    other_tiles: list[Tile] = []
-    for num in range(10):
-        for color in (Color.RED, Color.BLUE):
-            tile = Tile(num, color)
-            if num == 5:
-                tile = Tile(num, Color.GREEN)
-            if idx < 5 and tile == hand.tiles[idx]:
-                idx += 1
-                continue
-            else:
-                other_tiles.append(tile)
-    return other_tiles
-
-
-def calculate_initial_candidates(hand: Hand):
-    other_tiles: list[Tile] = prepare_other_tiles(hand)
-    print(f"Other tiles <{' '.join(map(str, other_tiles))}>")
-    with_duplicate = sorted(itertools.combinations(other_tiles, 5))
-    assert len(with_duplicate) > 0
-    candidates = [Hand(list(with_duplicate[0]))]
-    for tiles, tiles_prev in zip(with_duplicate[1:], with_duplicate):
-        if tiles != tiles_prev:
-            candidates.append(Hand(list(tiles)))
-    return candidates
+def enumerate_hands(available: list[tuple[int, int]], size: int = 5) -> Iterator[int]:
+    """
+    Enumerates the masks of distinct hands in ascending order of tiles.
+    `available` is a list of `(tile index, count)` sorted by index; a count of 2 is only for the green 5s,
+    whose tiles are identical, so a hand taking one of them is enumerated once.
+    """
+    if size == 0:
+        yield 0
+        return
+    if len(available) == 0:
+        return
+    (idx, count), rest = available[0], available[1:]
+    # taking more copies of the smallest tile comes first in ascending order
+    for taken in range(min(count, size), -1, -1):
+        taken_mask = ((1 << taken) - 1) << idx
+        for mask in enumerate_hands(rest, size - taken):
+            yield mask | taken_mask
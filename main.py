@@ -1,13 +1,26 @@
+import argparse
 import sys
 
+import script
 from game import Game
 from state import State
 
 
-def main():
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="main.py", description="TAGIRON assistance")
+    parser.add_argument("--script", metavar="PATH", help="replay the commands in the file (`-` for stdin) as JSON lines")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile dump of each command into the directory")
+    args = parser.parse_args(argv)
+    if args.script is not None:
+        if args.script == "-":
+            script.replay(sys.stdin, profile_dir=args.profile)
+        else:
+            with open(args.script) as f:
+                script.replay(f, profile_dir=args.profile)
+        return
     while True:
         initial_state = State()
-        game = Game(initial_state)
+        game = Game(initial_state, profile_dir=args.profile)
         restart = game.start()
         if restart:
             continue
@@ -0,0 +1,171 @@
+import argparse
+import bisect
+import concurrent.futures
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from typing import Sequence
+
+import universe
+from answer_table import AnswerTable, QuestionKey
+from qanda import QuestionCardId, kernel_options
+from state import State
+from utility import Hand
+
+"""
+Opening book: precomputed question ranking stored in a memory-mapped, versioned binary file.
+
+An entry is keyed by my hand and the answer history, the latter in its canonical form,
+i.e. the set of remaining candidates (different orders of the same answers share an entry).
+It holds the entropy, the max group size and the number of groups for every question, and the best question.
+Field cards are not part of the key: the score of a question does not depend on the other cards,
+so the best question among the current field is picked at lookup time.
+
+The book is built offline for the opening of every hand, and is loaded lazily on the first lookup:
+
+    $ poetry run python opening_book.py build
+
+Only the empty answer history is built, so the book is used until my first question is answered
+(the opponent's questions do not change the key); the later turns are ranked live.
+"""
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+MAGIC = b"TAGBOOK\0"
+VERSION = 2
+
+HEADER = struct.Struct("<8sIII")  # magic, version, number of questions, number of entries
+QUESTION = struct.Struct("<24sb")  # question card id, option (-1 for None)
+KEY = struct.Struct("<Q")
+BEST = struct.Struct("<B")
+SCORE = struct.Struct("<fHH")  # entropy, max group size, number of groups
+
+
+def all_question_keys() -> list[QuestionKey]:
+    return [(qcid, option) for qcid in QuestionCardId for option in kernel_options(qcid)]
+
+
+def entry_key(hand: Hand, candidates: int) -> int:
+    digest = hashlib.blake2b(hand.mask().to_bytes(3, "little"), digest_size=8)
+    digest.update(candidates.to_bytes((candidates.bit_length() + 7) // 8, "little"))
+    return KEY.unpack(digest.digest())[0]
+
+
+class Score:
+    def __init__(self, entropy: float, max_size: int, num_groups: int):
+        self.entropy = entropy
+        self.max_size = max_size
+        self.num_groups = num_groups
+
+
+class Entry:
+    def __init__(self, scores: dict[QuestionKey, Score], best: QuestionKey):
+        self.scores = scores
+        self.best = best
+
+    def best_in(self, question_keys: Sequence[QuestionKey]) -> QuestionKey | None:
+        """The best question among `question_keys` (e.g. the current field), or None if the book has none of them"""
+        if self.best in question_keys:
+            return self.best
+        available = [key for key in question_keys if key in self.scores]
+        return max(available, key=lambda key: self.scores[key].entropy, default=None)
+
+
+class OpeningBook:
+    def __init__(self, path: str = BOOK_PATH):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_questions, self.num_entries = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"unsupported opening book: {path}")
+        offset = HEADER.size
+        self.question_keys: list[QuestionKey] = []
+        for _ in range(num_questions):
+            qcid, option = QUESTION.unpack_from(self.buffer, offset)
+            self.question_keys.append((QuestionCardId(qcid.rstrip(b"\0").decode()), None if option < 0 else option))
+            offset += QUESTION.size
+        self.keys_offset = offset
+        self.records_offset = offset + KEY.size * self.num_entries
+        self.record_size = BEST.size + SCORE.size * num_questions
+
+    def key_at(self, i: int) -> int:
+        return KEY.unpack_from(self.buffer, self.keys_offset + KEY.size * i)[0]
+
+    def find(self, key: int) -> Entry | None:
+        i = bisect.bisect_left(range(self.num_entries), key, key=self.key_at)
+        if i == self.num_entries or self.key_at(i) != key:
+            return None
+        offset = self.records_offset + self.record_size * i
+        (best,) = BEST.unpack_from(self.buffer, offset)
+        scores = dict()
+        for j, question_key in enumerate(self.question_keys):
+            scores[question_key] = Score(*SCORE.unpack_from(self.buffer, offset + BEST.size + SCORE.size * j))
+        return Entry(scores, self.question_keys[best])
+
+    def lookup(self, state: State) -> Entry | None:
+        return self.find(entry_key(state.hand, state.candidates))
+
+
+_book: OpeningBook | None = None
+_book_loaded = False
+
+
+def lookup(state: State) -> Entry | None:
+    """Returns None when the book is missing, outdated or has no entry for the state"""
+    global _book, _book_loaded
+    if not _book_loaded:
+        _book_loaded = True
+        try:
+            _book = OpeningBook()
+        except (OSError, ValueError):
+            _book = None
+    return None if _book is None else _book.lookup(state)
+
+
+def analyze(hand_mask: int) -> tuple[int, bytes]:
+    """Builds the record of the opening of the hand"""
+    hand = Hand.from_mask(hand_mask)
+    question_keys = all_question_keys()
+    questions = {question.key(): question for card in universe.all_question_cards() for question in card.to_questions()}
+    table = AnswerTable(hand)
+    partitions = [table.partition(table.all, questions[key]) for key in question_keys]
+    best = max(range(len(question_keys)), key=lambda j: partitions[j].entropy)
+    record = BEST.pack(best) + b"".join(
+        SCORE.pack(partition.entropy, partition.max_size, len(partition.groups)) for partition in partitions
+    )
+    return entry_key(hand, table.all), record
+
+
+def build(path: str = BOOK_PATH, limit: int | None = None, max_workers: int | None = None) -> int:
+    hand_masks = sorted(universe.all_hand_masks())[:limit]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        entries = sorted(executor.map(analyze, hand_masks, chunksize=64))
+    question_keys = all_question_keys()
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(question_keys), len(entries)))
+        for qcid, option in question_keys:
+            f.write(QUESTION.pack(qcid.value.encode(), -1 if option is None else option))
+        for key, _ in entries:
+            f.write(KEY.pack(key))
+        for _, record in entries:
+            f.write(record)
+    os.replace(path + ".tmp", path)
+    return len(entries)
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="opening_book.py", description="Opening book of question rankings")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="build the book for the opening of every hand")
+    build_parser.add_argument("--output", default=BOOK_PATH)
+    build_parser.add_argument("--limit", type=int, default=None, help="only the first LIMIT hands, for testing")
+    build_parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        num_entries = build(args.output, args.limit, args.workers)
+        print(f"Wrote {num_entries} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
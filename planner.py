@@ -0,0 +1,211 @@
+import concurrent.futures
+import math
+import multiprocessing
+import threading
+import time
+from typing import Any, Callable
+
+from answer_table import AnswerTable, QuestionKey
+from qanda import Question, QuestionCardId
+from state import State
+
+"""
+Lookahead planner choosing the question which minimizes the expected number of turns
+to identify the opponent's hand.
+
+A turn is: ask a question in the field, receive the answer, then a random card in the deck replaces the asked card.
+The search goes `depth` turns deep and estimates the remaining turns at the leaves.
+Each question at the root is evaluated in a worker process, and every worker memoizes subtrees
+by (candidate bitset, field cards, deck cards, depth).
+Deepening stops at the wall-clock budget, returning the result of the deepest completed search.
+"""
+
+# Rough information obtained by one question, used to estimate remaining turns at leaves
+BITS_PER_TURN = 3.0
+MAX_DEPTH = 3
+DEFAULT_BUDGET = 3.0
+MEMO_LIMIT = 200_000
+
+# Worker process globals, set by `init_worker`
+_table: AnswerTable | None = None
+_card_questions: dict[QuestionCardId, list[QuestionKey]] = dict()
+_memo: dict[tuple, float] = dict()
+_stop: Any = None
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def init_worker(table: AnswerTable, card_questions: dict[QuestionCardId, list[QuestionKey]], stop: Any = None):
+    global _table, _card_questions, _stop
+    _table = table
+    _card_questions = card_questions
+    _stop = stop
+    _memo.clear()
+
+
+def estimate_turns(candidates: int) -> float:
+    count = candidates.bit_count()
+    if count <= 1:
+        return 0.0
+    return max(1.0, math.log2(count) / BITS_PER_TURN)
+
+
+def partition(candidates: int, question_key: QuestionKey) -> list[tuple[int, int]]:
+    assert _table is not None
+    return [(group, _table.weight(group)) for group in _table.groupby(candidates, question_key).values()]
+
+
+def question_value(
+    candidates: int,
+    field: frozenset[QuestionCardId],
+    deck: frozenset[QuestionCardId],
+    question_key: QuestionKey,
+    depth: int,
+    deadline: float,
+) -> float:
+    """Expected turns when asking the question now, this turn included"""
+    if time.time() > deadline or (_stop is not None and _stop.is_set()):
+        raise BudgetExceeded
+    groups = partition(candidates, question_key)
+    total = sum(weight for _, weight in groups)
+    next_field = field - {question_key[0]}
+    value = 1.0
+    for group, weight in groups:
+        if group.bit_count() <= 1:
+            continue
+        if depth <= 1:
+            rest = estimate_turns(group)
+        elif len(deck) == 0:
+            rest = expected_turns(group, next_field, deck, depth - 1, deadline)
+        else:
+            rest = sum(expected_turns(group, next_field | {card}, deck - {card}, depth - 1, deadline) for card in deck)
+            rest /= len(deck)
+        value += rest * weight / total
+    return value
+
+
+def expected_turns(
+    candidates: int,
+    field: frozenset[QuestionCardId],
+    deck: frozenset[QuestionCardId],
+    depth: int,
+    deadline: float,
+) -> float:
+    if candidates.bit_count() <= 1:
+        return 0.0
+    key = (candidates, field, deck, depth)
+    if key in _memo:
+        return _memo[key]
+    question_keys = [question_key for card in field for question_key in _card_questions[card]]
+    if len(question_keys) == 0:
+        return estimate_turns(candidates)
+    value = min(question_value(candidates, field, deck, question_key, depth, deadline) for question_key in question_keys)
+    if len(_memo) > MEMO_LIMIT:
+        _memo.clear()
+    _memo[key] = value
+    return value
+
+
+class Plan:
+    def __init__(self, question: Question, expected_turns: float, depth: int):
+        self.question = question
+        self.expected_turns = expected_turns
+        self.depth = depth
+
+    def __repr__(self):
+        return f"Plan<{self.question}, expected turns {self.expected_turns:.3f}, depth {self.depth}>"
+
+
+def card_questions(state: State) -> dict[QuestionCardId, list[QuestionKey]]:
+    cards = [*state.question_cards_in_deck, *state.question_cards_in_field, *state.question_cards_in_trash]
+    return {card.id: [question.key() for question in card.to_questions()] for card in cards}
+
+
+def search_keys(state: State) -> tuple[int, frozenset[QuestionCardId], frozenset[QuestionCardId]]:
+    field = frozenset(card.id for card in state.question_cards_in_field)
+    deck = frozenset(card.id for card in state.question_cards_in_deck)
+    return state.candidates, field, deck
+
+
+def plan_in_process(state: State, budget: float | None = DEFAULT_BUDGET, max_depth: int = MAX_DEPTH) -> Plan | None:
+    """
+    Same as `Planner.plan`, but searches in the current process, e.g. in a worker of the self-play simulator.
+    With no `budget`, every depth up to `max_depth` is searched, so the plan does not depend on the machine's speed.
+    """
+    if _table is not state.table:
+        init_worker(state.table, card_questions(state))
+    questions = state.possible_questions()
+    deadline = math.inf if budget is None else time.time() + budget
+    best: Plan | None = None
+    for depth in range(1, max_depth + 1):
+        try:
+            values = [question_value(*search_keys(state), question.key(), depth, deadline) for question in questions]
+        except BudgetExceeded:
+            break
+        if len(values) == 0:
+            break
+        value, question = min(zip(values, questions), key=lambda item: item[0])
+        best = Plan(question, value, depth)
+    return best
+
+
+class Planner:
+    def __init__(self, state: State, max_workers: int | None = None):
+        # tells workers to abandon the running search
+        self.stop = multiprocessing.Event()
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker, initargs=(state.table, card_questions(state), self.stop)
+        )
+
+    def plan(
+        self,
+        state: State,
+        budget: float = DEFAULT_BUDGET,
+        max_depth: int = MAX_DEPTH,
+        on_progress: Callable[[Plan], None] | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> Plan | None:
+        """
+        `on_progress` receives the plan of each completed depth.
+        Setting `cancelled` stops the search early, as if the budget ran out.
+        An exception raised by a worker is raised again here.
+        """
+        questions = state.possible_questions()
+        if len(questions) == 0:
+            return None
+        deadline = time.time() + budget
+        candidates, field, deck = search_keys(state)
+        best: Plan | None = None
+        for depth in range(1, max_depth + 1):
+            futures = [
+                self.executor.submit(question_value, candidates, field, deck, question.key(), depth, deadline)
+                for question in questions
+            ]
+            not_done = set(futures)
+            while len(not_done) > 0 and time.time() < deadline and not (cancelled and cancelled.is_set()):
+                _, not_done = concurrent.futures.wait(not_done, timeout=min(0.1, max(0.0, deadline - time.time())))
+            finished = [future for future in futures if future.done() and not future.cancelled()]
+            errors = [future.exception() for future in finished if future.exception() is not None]
+            if len(not_done) > 0 or len(errors) > 0:
+                for future in not_done:
+                    future.cancel()
+                self.stop.set()
+                concurrent.futures.wait(not_done)
+                self.stop.clear()
+                # a worker failure reaches the caller; only the budget or a cancel returns the best plan so far
+                for error in errors:
+                    if not isinstance(error, BudgetExceeded):
+                        raise error
+                break
+            values = [future.result() for future in futures]
+            value, question = min(zip(values, questions), key=lambda item: item[0])
+            best = Plan(question, value, depth)
+            if on_progress is not None:
+                on_progress(best)
+        return best
+
+    def shutdown(self):
+        self.stop.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
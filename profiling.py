@@ -0,0 +1,80 @@
+import contextlib
+import cProfile
+import functools
+import itertools
+import os
+import re
+import time
+from typing import Callable, Iterator, TypeVar
+
+"""
+Lightweight instrumentation.
+With `TAGIRON_TIMINGS=1` in the environment, the functions decorated with `timed`
+accumulate their wall-clock time in a registry, shown in the "Timings" section of the dashboard.
+Otherwise the decorator returns the function itself, so there is no overhead.
+
+`profile_command` writes a cProfile dump per command (see `main.py --profile`), to be read with `pstats`.
+"""
+
+ENABLED = os.environ.get("TAGIRON_TIMINGS", "") not in ("", "0")
+
+F = TypeVar("F", bound=Callable)
+
+
+class Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.last = elapsed
+
+
+timings: dict[str, Timing] = dict()
+
+
+@contextlib.contextmanager
+def _timer(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.setdefault(name, Timing()).add(time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    def decorator(function: F) -> F:
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _timer(name):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+_command_counter = itertools.count(1)
+
+
+@contextlib.contextmanager
+def profile_command(command: str, directory: str | None) -> Iterator[None]:
+    """Profiles the block into `<directory>/<n>-<command>.pstats`; does nothing if `directory` is None"""
+    if directory is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        label = re.sub(r"[^0-9A-Za-z_]+", "_", command).strip("_") or "empty"
+        profiler.dump_stats(os.path.join(directory, f"{next(_command_counter):04d}-{label[:40]}.pstats"))
@@ -1,8 +1,10 @@
 import collections
+import functools
 import re
 from enum import Enum
+from typing import Callable, Iterable
 
-from utility import Color, Hand, colorize
+from utility import Color, Hand, colorize, entire_east_asian_width
 
 
 class QuestionCardId(Enum):
@@ -39,23 +41,70 @@ class QuestionType(Enum):
     SHARED = "shared"
 
 
+# Every answer code (position bitmask or count/sum) is less than this
+NUM_ANSWER_CODES = 64
+NUM_POSITIONS = 5
+
+
 class Answer:
+    """
+    Frozen and hashable; answers are equal iff they have the same type and the same canonical code,
+    a 5-bit position mask for WHERE and the number itself for the other types.
+    """
+
+    __slots__ = ("type", "value", "code")
+
     def __init__(self, type: QuestionType, value: int | tuple[int, ...]):
-        self.type = type
-        self.value = value
-        if self.type == QuestionType.WHERE:
-            assert isinstance(self.value, tuple)
-        elif self.type in (QuestionType.COUNT, QuestionType.SUM):
-            assert isinstance(self.value, int)
-        elif self.type == QuestionType.SHARED:
-            assert isinstance(self.value, int)
+        if type == QuestionType.WHERE:
+            if not isinstance(value, tuple) or not all(0 <= idx < NUM_POSITIONS for idx in value):
+                raise ValueError(f"invalid positions: {value}")
+            code = encode_answer_value(value)
+            value = tuple(idx for idx in range(NUM_POSITIONS) if code >> idx & 1)
+        elif isinstance(value, int) and 0 <= value < NUM_ANSWER_CODES:
+            code = value
         else:
-            assert False
+            raise ValueError(f"invalid {type.value} answer: {value}")
+        object.__setattr__(self, "type", type)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "code", code)
+
+    @classmethod
+    def from_code(cls, type: QuestionType, code: int):
+        if type == QuestionType.WHERE:
+            return cls(type, tuple(idx for idx in range(NUM_POSITIONS) if code >> idx & 1))
+        return cls(type, code)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (Answer, (self.type, self.value))
+
+    def __eq__(self, other):
+        return isinstance(other, Answer) and self.type == other.type and self.code == other.code
+
+    def __hash__(self):
+        return hash((self.type, self.code))
 
     def __repr__(self):
         return f"Answer<{self.value}>"
 
 
+def encode_answer_value(value: int | tuple[int, ...]) -> int:
+    """
+    Encode an answer value into a small non-negative integer.
+    WHERE answers (tuples of distinct positions) become position bitmasks; other answers are already integers.
+    """
+    if isinstance(value, tuple):
+        mask = 0
+        for idx in value:
+            if mask >> idx & 1:
+                raise ValueError(f"duplicated position: {idx}")
+            mask |= 1 << idx
+        return mask
+    return value
+
+
 # ca: calculate answer
 def ca_where_x(hand: Hand, x: int) -> tuple[int, ...]:
     ans = []
@@ -130,6 +179,59 @@ def ca_shared_diff_min_max(hand: Hand) -> int:
     return max_tile.num - min_tile.num
 
 
+AnswerValue = int | tuple[int, ...]
+AnswerFunction = Callable[[Hand], AnswerValue]
+
+# Answer kernels keyed by question card id: (available options, factory binding an option to an answer function)
+_kernels: dict[QuestionCardId, tuple[tuple[int | None, ...], Callable[[int | None], AnswerFunction]]] = dict()
+
+
+def register_kernel(
+    qcid: QuestionCardId, make_kernel: Callable[[int | None], AnswerFunction], options: tuple[int | None, ...] = (None,)
+):
+    _kernels[qcid] = (options, make_kernel)
+
+
+def _kernel(qcid: QuestionCardId) -> tuple[tuple[int | None, ...], Callable[[int | None], AnswerFunction]]:
+    if qcid not in _kernels:
+        raise KeyError(f"no answer kernel registered for `{qcid.value}`")
+    return _kernels[qcid]
+
+
+def kernel_options(qcid: QuestionCardId) -> tuple[int | None, ...]:
+    return _kernel(qcid)[0]
+
+
+def bind_kernel(qcid: QuestionCardId, option: int | None) -> AnswerFunction:
+    options, make_kernel = _kernel(qcid)
+    if option not in options:
+        raise ValueError(f"invalid option for `{qcid.value}`: {option}")
+    return make_kernel(option)
+
+
+register_kernel(QuestionCardId.WHERE_0, lambda _: functools.partial(ca_where_x, x=0))
+register_kernel(QuestionCardId.WHERE_12, lambda option: functools.partial(ca_where_x, x=option), (1, 2))
+register_kernel(QuestionCardId.WHERE_34, lambda option: functools.partial(ca_where_x, x=option), (3, 4))
+register_kernel(QuestionCardId.WHERE_5, lambda _: functools.partial(ca_where_x, x=5))
+register_kernel(QuestionCardId.WHERE_67, lambda option: functools.partial(ca_where_x, x=option), (6, 7))
+register_kernel(QuestionCardId.WHERE_89, lambda option: functools.partial(ca_where_x, x=option), (8, 9))
+register_kernel(QuestionCardId.WHERE_SEQUENTIAL, lambda _: ca_where_sequential)
+register_kernel(QuestionCardId.WHERE_NEIGHBORING_SAME_COLOR, lambda _: ca_where_neighboring_same_color)
+register_kernel(QuestionCardId.COUNT_EVEN, lambda _: ca_count_even_odd)
+register_kernel(QuestionCardId.COUNT_ODD, lambda _: functools.partial(ca_count_even_odd, odd=True))
+register_kernel(QuestionCardId.COUNT_RED, lambda _: ca_count_red_blue)
+register_kernel(QuestionCardId.COUNT_BLUE, lambda _: functools.partial(ca_count_red_blue, blue=True))
+register_kernel(QuestionCardId.COUNT_PAIRS, lambda _: ca_count_pairs)
+register_kernel(QuestionCardId.SUM_3_LEFT, lambda _: ca_sum_3_x)
+register_kernel(QuestionCardId.SUM_3_MIDDLE, lambda _: functools.partial(ca_sum_3_x, start=1))
+register_kernel(QuestionCardId.SUM_3_RIGHT, lambda _: functools.partial(ca_sum_3_x, start=2))
+register_kernel(QuestionCardId.SUM_RED, lambda _: ca_sum_red_blue)
+register_kernel(QuestionCardId.SUM_BLUE, lambda _: functools.partial(ca_sum_red_blue, blue=True))
+register_kernel(QuestionCardId.SHARED_SUM_ALL, lambda _: ca_shared_sum_all)
+register_kernel(QuestionCardId.SHARED_CENTER_45, lambda _: ca_shared_center_45)
+register_kernel(QuestionCardId.SHARED_DIFF_MIN_MAX, lambda _: ca_shared_diff_min_max)
+
+
 class QuestionCard:
     def __init__(self, qcid: QuestionCardId, ja: str, en: str):
         self.id = qcid
@@ -145,95 +247,79 @@ class QuestionCard:
             self.type = QuestionType.SHARED
         else:
             assert False
+        # cards are static, so their rendered forms are computed once
+        self.text_without_lf = self.ja.replace("\n", " ")
+        self.label = f"Card<{self.id.value}>"
+        self.label_width = entire_east_asian_width(self.label)
+        self.colored = colorize(self.text_without_lf)
+        self.colored_width = entire_east_asian_width(self.colored)
+        self.questions = tuple(Question(self, option) for option in kernel_options(self.id))
+
+    def __reduce__(self):
+        return (QuestionCard, (self.id, self.ja, self.en))
 
     def __repr__(self):
-        ja_shrinked = re.sub(r"\n[\s\S]*$", "...", self.ja_without_lf())
+        ja_shrinked = re.sub(r"\n[\s\S]*$", "...", self.text_without_lf)
         return colorize(f"Card<{self.id.value}> {ja_shrinked}")
 
     def card_label(self):
-        return f"Card<{self.id.value}>"
+        return self.label
 
     def ja_without_lf(self):
-        return self.ja.replace("\n", " ")
+        return self.text_without_lf
 
     def colored_description(self):
-        return colorize(self.ja_without_lf())
+        return self.colored
 
     def to_questions(self):
-        if self.id == QuestionCardId.WHERE_12:
-            return [Question(self, 1), Question(self, 2)]
-        if self.id == QuestionCardId.WHERE_34:
-            return [Question(self, 3), Question(self, 4)]
-        if self.id == QuestionCardId.WHERE_67:
-            return [Question(self, 6), Question(self, 7)]
-        if self.id == QuestionCardId.WHERE_89:
-            return [Question(self, 8), Question(self, 9)]
-        return [Question(self)]
+        return list(self.questions)
 
 
 class Question:
+    """Frozen and hashable; questions are equal iff they have the same key"""
+
+    __slots__ = ("question_card", "option", "type", "answer_function", "text", "colored_label", "label_width", "_key")
+
     def __init__(self, question_card: QuestionCard, option: int | None = None):
-        self.question_card = question_card
-        self.option = option
-        self.type = self.question_card.type
+        opt = "" if option is None else f", option({option})"
+        colored_label = f"Question<{question_card.colored_description()}{opt}>"
+        attributes = {
+            "question_card": question_card,
+            "option": option,
+            "type": question_card.type,
+            "answer_function": bind_kernel(question_card.id, option),
+            "text": colorize(f"Question<{question_card.ja_without_lf()}{opt}>"),
+            "colored_label": colored_label,
+            "label_width": entire_east_asian_width(colored_label),
+            "_key": (question_card.id, option),
+        }
+        for name, value in attributes.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (Question, (self.question_card, self.option))
+
+    def key(self) -> tuple[QuestionCardId, int | None]:
+        return self._key
+
+    def __eq__(self, other):
+        return isinstance(other, Question) and self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
 
     # NOTE: too specific implementation
     def __repr__(self):
-        description = self.question_card.ja_without_lf()
-        opt = "" if self.option is None else f", option({self.option})"
-        return colorize(f"Question<{description}{opt}>")
+        return self.text
 
     def colored_question_label(self):
-        description = self.question_card.colored_description()
-        opt = "" if self.option is None else f", option({self.option})"
-        return colorize(f"Question<{description}{opt}>")
-
-    def ask(self, hand: Hand):
-        if self.question_card.id == QuestionCardId.WHERE_0:
-            return ca_where_x(hand, 0)
-        elif self.question_card.id == QuestionCardId.WHERE_12:
-            assert self.option in (1, 2)
-            return ca_where_x(hand, self.option)
-        elif self.question_card.id == QuestionCardId.WHERE_34:
-            assert self.option in (3, 4)
-            return ca_where_x(hand, self.option)
-        elif self.question_card.id == QuestionCardId.WHERE_5:
-            return ca_where_x(hand, 5)
-        elif self.question_card.id == QuestionCardId.WHERE_67:
-            assert self.option in (6, 7)
-            return ca_where_x(hand, self.option)
-        elif self.question_card.id == QuestionCardId.WHERE_89:
-            assert self.option in (8, 9)
-            return ca_where_x(hand, self.option)
-        elif self.question_card.id == QuestionCardId.WHERE_SEQUENTIAL:
-            return ca_where_sequential(hand)
-        elif self.question_card.id == QuestionCardId.WHERE_NEIGHBORING_SAME_COLOR:
-            return ca_where_neighboring_same_color(hand)
-        elif self.question_card.id == QuestionCardId.COUNT_EVEN:
-            return ca_count_even_odd(hand)
-        elif self.question_card.id == QuestionCardId.COUNT_ODD:
-            return ca_count_even_odd(hand, odd=True)
-        elif self.question_card.id == QuestionCardId.COUNT_RED:
-            return ca_count_red_blue(hand)
-        elif self.question_card.id == QuestionCardId.COUNT_BLUE:
-            return ca_count_red_blue(hand, blue=True)
-        elif self.question_card.id == QuestionCardId.COUNT_PAIRS:
-            return ca_count_pairs(hand)
-        elif self.question_card.id == QuestionCardId.SUM_3_LEFT:
-            return ca_sum_3_x(hand)
-        elif self.question_card.id == QuestionCardId.SUM_3_MIDDLE:
-            return ca_sum_3_x(hand, start=1)
-        elif self.question_card.id == QuestionCardId.SUM_3_RIGHT:
-            return ca_sum_3_x(hand, start=2)
-        elif self.question_card.id == QuestionCardId.SUM_RED:
-            return ca_sum_red_blue(hand)
-        elif self.question_card.id == QuestionCardId.SUM_BLUE:
-            return ca_sum_red_blue(hand, blue=True)
-        elif self.question_card.id == QuestionCardId.SHARED_SUM_ALL:
-            return ca_shared_sum_all(hand)
-        elif self.question_card.id == QuestionCardId.SHARED_CENTER_45:
-            return ca_shared_center_45(hand)
-        elif self.question_card.id == QuestionCardId.SHARED_DIFF_MIN_MAX:
-            return ca_shared_diff_min_max(hand)
-        else:
-            raise NotImplementedError
+        return self.colored_label
+
+    def ask(self, hand: Hand) -> AnswerValue:
+        return self.answer_function(hand)
+
+    def ask_many(self, hands: Iterable[Hand]) -> list[AnswerValue]:
+        return list(map(self.answer_function, hands))
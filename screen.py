@@ -0,0 +1,24 @@
+import contextlib
+import io
+import sys
+from typing import Iterator
+
+"""
+Terminal rendering without spawning `clear`: a frame is composed in memory
+and written to stdout at once, preceded by the ANSI sequences clearing the screen.
+"""
+
+# move the cursor home, then erase the screen and the scrollback
+CLEAR_SCREEN = "\033[H\033[2J\033[3J"
+
+
+@contextlib.contextmanager
+def frame() -> Iterator[io.StringIO]:
+    """Clears the screen and draws everything printed in the block with a single write"""
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            yield buffer
+    finally:
+        sys.stdout.write(CLEAR_SCREEN + buffer.getvalue())
+        sys.stdout.flush()
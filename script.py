@@ -0,0 +1,166 @@
+import json
+import sys
+from typing import Any, Iterable, Iterator, TextIO
+
+import init_phase
+import profiling
+from game import Game
+from qanda import Answer, Question, QuestionType
+from state import State
+from utility import Hand
+
+"""
+Non-interactive mode replaying recorded games, one command per line:
+
+    hand 1r 2b 5 7b 9r          # starts a new game with my hand
+    add 3                       # the card at index 3 of the deck (or its id, e.g. `add count_red`) is added
+    question 4 answer 1 3       # I asked the question at index 4 of the ranking, answered positions 1 and 3
+    question 2 answer none      # an empty answer to a WHERE question
+    opponent 0                  # the opponent asked the question at index 0
+    opponent 1 answer 2         # the opponent asked a shared question answered 2
+    undo / redo
+
+Indices are the ones shown by the interactive mode. Empty lines and `#` comments are ignored.
+Each command emits a JSON line with the resulting ranking (or the error), streaming as lines are read,
+so a log of many games is analysed in one process:
+
+    $ poetry run python main.py --script moves.txt
+"""
+
+
+class ScriptError(Exception):
+    pass
+
+
+def parse_hand(args: list[str]) -> Hand:
+    if len(args) != 5:
+        raise ScriptError("a hand must have 5 tiles")
+    try:
+        tiles = [init_phase.parse_tile(arg) for arg in args]
+    except ValueError as e:
+        raise ScriptError(str(e)) from e
+    others = [tile for tile in tiles if tile.num != 5]
+    if len(tiles) - len(others) > 2 or len(set(others)) != len(others):
+        raise ScriptError("duplicated tiles")
+    return Hand(tiles)
+
+
+def parse_index(arg: str, size: int) -> int:
+    try:
+        idx = int(arg)
+    except ValueError as e:
+        raise ScriptError(f"invalid index `{arg}`") from e
+    if not 0 <= idx < size:
+        raise ScriptError(f"index {idx} out of range")
+    return idx
+
+
+def parse_answer(state: State, question: Question, args: list[str]) -> Answer:
+    if len(args) == 0 or args[0] != "answer":
+        raise ScriptError("`answer` is expected")
+    values = args[1:]
+    try:
+        if question.type == QuestionType.WHERE:
+            answer = Answer(question.type, () if values == ["none"] else tuple(int(value) - 1 for value in values))
+        elif len(values) != 1:
+            raise ScriptError("a single number is expected")
+        else:
+            answer = Answer(question.type, int(values[0]))
+    except ValueError as e:
+        raise ScriptError(f"invalid answer `{' '.join(values)}`") from e
+    if not state.is_possible_answer(question, answer):
+        raise ScriptError(f"no candidate gives answer `{' '.join(values)}`")
+    return answer
+
+
+def ranking(state: State) -> list[dict[str, Any]]:
+    rows = []
+    for idx, question in enumerate(state.possible_questions()):
+        partition = state.partition(question)
+        qcid, option = question.key()
+        rows.append(
+            {"index": idx, "question": qcid.value, "option": option, "entropy": partition.entropy, "max": partition.max_size}
+        )
+    return sorted(rows, key=lambda row: -row["entropy"])
+
+
+class ScriptRunner:
+    """Replays commands against `Game` without the interactive UI"""
+
+    def __init__(self, profile_dir: str | None = None):
+        self.game: Game | None = None
+        # each command is profiled into this directory if set
+        self.profile_dir = profile_dir
+
+    def execute(self, line: str) -> State | None:
+        """Returns the current state after the command, or None if the line is empty"""
+        words = line.split("#", 1)[0].split()
+        if len(words) == 0:
+            return None
+        command, args = words[0], words[1:]
+        if command == "hand":
+            # a malformed hand keeps the game in progress
+            hand = parse_hand(args)
+            self.close()
+            self.game = Game(State(hand), background=False)
+            return self.game.current_state()
+        if self.game is None:
+            raise ScriptError("`hand` is expected first")
+        game, state = self.game, self.game.current_state()
+        if command == "add":
+            if len(args) != 1:
+                raise ScriptError("usage: add <index or card id>")
+            ids = [card.id.value for card in state.question_cards_in_deck]
+            idx = ids.index(args[0]) if args[0] in ids else parse_index(args[0], len(ids))
+            game.add_question_card(idx)
+        elif command in ("question", "opponent"):
+            if len(args) < 1:
+                raise ScriptError(f"usage: {command} <index> [answer ...]")
+            questions = state.possible_questions()
+            question = questions[parse_index(args[0], len(questions))]
+            if command == "question":
+                game.narrow_by_qa(question, parse_answer(state, question, args[1:]))
+            else:
+                answer = parse_answer(state, question, args[1:]) if question.type == QuestionType.SHARED else None
+                game.opponent_ask(question, answer)
+        elif command == "undo":
+            if not game.undo():
+                raise ScriptError("nothing to undo")
+        elif command == "redo":
+            if not game.redo():
+                raise ScriptError("nothing to redo")
+        else:
+            raise ScriptError(f"unknown command `{command}`")
+        return game.current_state()
+
+    def run(self, lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+        """Executes the lines lazily, yielding a record per command"""
+        for number, line in enumerate(lines, 1):
+            if line.split("#", 1)[0].strip() == "":
+                continue
+            try:
+                with profiling.profile_command(line, self.profile_dir):
+                    state = self.execute(line)
+            except ScriptError as e:
+                yield {"line": number, "command": line.strip(), "error": str(e)}
+                continue
+            if state is None:
+                continue
+            yield {
+                "line": number,
+                "command": line.strip(),
+                "candidates": state.num_candidates(),
+                "ranking": ranking(state),
+            }
+        self.close()
+
+    def close(self) -> None:
+        if self.game is not None:
+            self.game.finish()
+            self.game = None
+
+
+def replay(lines: Iterable[str], out: TextIO = sys.stdout, profile_dir: str | None = None) -> None:
+    for record in ScriptRunner(profile_dir).run(lines):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
@@ -0,0 +1,125 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import statistics
+import sys
+from typing import Callable
+
+import planner
+from qanda import Answer, Question, QuestionType
+from state import State
+from utility import NUM_TILES, Hand, Tile
+
+"""
+Headless self-play simulator evaluating question strategies.
+Each game deals random hands, shuffles the question card deck and lays out the initial field.
+Then I ask a question chosen by the strategy (answered from the opponent's hand) and the opponent asks a random one,
+each followed by a replacement card from the deck, until I identify the opponent's hand.
+Games run in parallel on a process pool, and the distribution of my turns to solve is reported.
+
+    $ poetry run python simulate.py --games 1000 --strategy entropy
+"""
+
+NUM_INITIAL_FIELD_CARDS = 6
+MAX_TURNS = 30
+# a fixed depth rather than a wall-clock budget, so that a seed always plays the same game
+LOOKAHEAD_DEPTH = 2
+
+Strategy = Callable[[State], Question]
+
+
+def deal_hands(rng: random.Random) -> tuple[Hand, Hand]:
+    tile_indices = rng.sample(range(NUM_TILES), 10)
+    tiles = [Tile.from_index(idx) for idx in tile_indices]
+    return Hand(tiles[:5]), Hand(tiles[5:])
+
+
+def max_entropy(state: State) -> Question:
+    return max(state.possible_questions(), key=state.calc_entropy)
+
+
+def min_max_group(state: State) -> Question:
+    return min(state.possible_questions(), key=lambda q: (state.partition(q).max_size, -state.calc_entropy(q)))
+
+
+def lookahead(state: State) -> Question:
+    plan = planner.plan_in_process(state, budget=None, max_depth=LOOKAHEAD_DEPTH)
+    return max_entropy(state) if plan is None else plan.question
+
+
+STRATEGIES: dict[str, Strategy] = {
+    "entropy": max_entropy,
+    "min_max_group": min_max_group,
+    "lookahead": lookahead,
+}
+
+
+def draw(state: State, rng: random.Random) -> State:
+    if len(state.question_cards_in_deck) == 0:
+        return state
+    return state.add_question_card(rng.randrange(len(state.question_cards_in_deck)))
+
+
+def play(seed: int, strategy_name: str) -> int | None:
+    """Returns my turns to identify the opponent's hand, or None if not identified"""
+    strategy = STRATEGIES[strategy_name]
+    rng = random.Random(seed)
+    hand, opponent_hand = deal_hands(rng)
+    state = State(hand)
+    for _ in range(NUM_INITIAL_FIELD_CARDS):
+        state = draw(state, rng)
+    for turn in range(1, MAX_TURNS + 1):
+        if len(state.question_cards_in_field) == 0:
+            return None
+        question = strategy(state)
+        state = draw(state.narrow_by_qa(question, Answer(question.type, question.ask(opponent_hand))), rng)
+        if state.num_candidates() <= 1:
+            return turn
+        questions = state.possible_questions()
+        if len(questions) > 0:
+            question = rng.choice(questions)
+            answer = Answer(question.type, question.ask(opponent_hand)) if question.type == QuestionType.SHARED else None
+            state = draw(state.opponent_ask(question, answer), rng)
+            if state.num_candidates() <= 1:
+                return turn
+    return None
+
+
+def simulate(strategy_name: str, games: int, first_seed: int = 0, max_workers: int | None = None) -> list[int | None]:
+    seeds = range(first_seed, first_seed + games)
+    chunksize = max(1, games // (4 * (max_workers or os.cpu_count() or 1)))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(play, seeds, [strategy_name] * games, chunksize=chunksize))
+
+
+def report(strategy_name: str, results: list[int | None]) -> dict:
+    solved = [turns for turns in results if turns is not None]
+    return {
+        "strategy": strategy_name,
+        "games": len(results),
+        "unsolved": len(results) - len(solved),
+        "mean": statistics.mean(solved) if solved else None,
+        "median": statistics.median(solved) if solved else None,
+        "distribution": dict(sorted(collections.Counter(solved).items())),
+    }
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="simulate.py", description="Self-play simulation of question strategies")
+    parser.add_argument("--strategy", choices=[*STRATEGIES, "all"], default="all")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    strategy_names = list(STRATEGIES) if args.strategy == "all" else [args.strategy]
+    for strategy_name in strategy_names:
+        results = simulate(strategy_name, args.games, args.first_seed, args.workers)
+        print(json.dumps(report(strategy_name, results)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
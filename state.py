@@ -1,99 +1,210 @@
+import functools
 import itertools
-import json
 
+import cards
 import init_phase
-import utility
-from qanda import Answer, Question, QuestionCard, QuestionCardId, QuestionType
-from utility import Hand
+from answer_table import AnswerTable, Partition
+from qanda import Answer, Question, QuestionCard, QuestionType
+from utility import Hand, iter_bits
 
 """
 `State` class represents the state of the game.
-Note that `State` objects should be considered immutable.
-"""
+`State` objects are immutable: actions return a new state sharing the unchanged parts,
+i.e. the answer table, the candidate bitset and the tuples of question cards.
 
+Narrowing is memoized per state, so the hypothetical answers explored by `what_if` are applied instantly.
 
-def all_question_cards():
-    with open("questions.json") as f:
-        raw_question_data = json.load(f)
-    return [QuestionCard(QuestionCardId(data["id"]), data["ja"], data["en"]) for data in raw_question_data]
+Besides my candidates of the opponent's hand, a state mirrors what the opponent knows about my hand:
+`revealed` is the bitset (over the whole universe) of the hands giving the same answers as mine
+to every question I answered, i.e. the opponent's questions and the shared ones.
+"""
 
 
 class State:
     def __init__(
         self,
         hand: Hand | None = None,
-        candidates: list[Hand] | None = None,
-        question_cards_in_deck: list[QuestionCard] | None = None,
-        question_cards_in_field: list[QuestionCard] | None = None,
-        question_cards_in_trash: list[QuestionCard] | None = None,
+        candidates: int | None = None,
+        question_cards_in_deck: tuple[QuestionCard, ...] | None = None,
+        question_cards_in_field: tuple[QuestionCard, ...] | None = None,
+        question_cards_in_trash: tuple[QuestionCard, ...] | None = None,
+        table: AnswerTable | None = None,
+        last_action: str = "",
+        revealed: int | None = None,
+        total_weight: int | None = None,
     ):
         self.hand = hand if hand else init_phase.input_hand_with_retry()
-        self.candidates = init_phase.calculate_initial_candidates(self.hand) if candidates is None else candidates
-        self.question_cards_in_deck = all_question_cards() if question_cards_in_deck is None else question_cards_in_deck
-        self.question_cards_in_field: list[QuestionCard] = [] if question_cards_in_field is None else question_cards_in_field
-        self.question_cards_in_trash: list[QuestionCard] = [] if question_cards_in_trash is None else question_cards_in_trash
-        self.last_action = ""
+        self.question_cards_in_deck = cards.question_cards() if question_cards_in_deck is None else question_cards_in_deck
+        self.question_cards_in_field: tuple[QuestionCard, ...] = () if question_cards_in_field is None else question_cards_in_field
+        self.question_cards_in_trash: tuple[QuestionCard, ...] = () if question_cards_in_trash is None else question_cards_in_trash
+        self.table = AnswerTable(self.hand) if table is None else table
+        # bitset over the hands in `table`
+        self.candidates = self.table.all if candidates is None else candidates
+        self.last_action = last_action
+        self.revealed = self.table.universe.all if revealed is None else revealed
+        # total weight of the candidates (see `calc_case`), computed once when narrowing
+        self.total_weight = self.table.weight(self.candidates) if total_weight is None else total_weight
+        self.children: dict[tuple[Question, Answer], State] = dict()
+        self.what_ifs: dict[Question, list[WhatIf]] = dict()
 
-    def copy(self):
+    def copy(
+        self,
+        candidates: int | None = None,
+        question_cards_in_deck: tuple[QuestionCard, ...] | None = None,
+        question_cards_in_field: tuple[QuestionCard, ...] | None = None,
+        question_cards_in_trash: tuple[QuestionCard, ...] | None = None,
+        last_action: str = "",
+        revealed: int | None = None,
+        total_weight: int | None = None,
+    ):
         return State(
             self.hand,
-            self.candidates,
-            self.question_cards_in_deck,
-            self.question_cards_in_field,
-            self.question_cards_in_trash,
+            self.candidates if candidates is None else candidates,
+            self.question_cards_in_deck if question_cards_in_deck is None else question_cards_in_deck,
+            self.question_cards_in_field if question_cards_in_field is None else question_cards_in_field,
+            self.question_cards_in_trash if question_cards_in_trash is None else question_cards_in_trash,
+            self.table,
+            last_action,
+            self.revealed if revealed is None else revealed,
+            self.total_weight if candidates is None else total_weight,
         )
 
-    def calc_case(self, candidate: Hand) -> int:
-        self_fives = list(filter(lambda tile: tile.num == 5, self.hand.tiles))
-        cand_fives = list(filter(lambda tile: tile.num == 5, candidate.tiles))
-        if len(self_fives) == 0 and len(cand_fives) == 1:
-            return 2
-        return 1
+    def calc_case(self, candidate: int) -> int:
+        """
+        Number of ways the opponent can hold the candidate;
+        a hand with one green 5 counts twice when both 5s are left to the opponent.
+        """
+        return self.table.case(candidate)
+
+    def num_candidates(self) -> int:
+        return self.candidates.bit_count()
+
+    def candidate_hands(self) -> list[Hand]:
+        return [self.table.hand(idx) for idx in iter_bits(self.candidates)]
 
-    def groupby(self, question: Question) -> dict[tuple[int, ...] | int, list[Hand]]:
-        sorted_candidates = sorted(self.candidates, key=question.ask)
-        groups = dict()
-        for k, g in itertools.groupby(sorted_candidates, key=question.ask):
-            groups[k] = list(g)
-        return groups
+    def probability(self, candidate: int) -> float:
+        """Posterior probability that the opponent holds the candidate"""
+        return self.calc_case(candidate) / self.total_weight if self.total_weight > 0 else 0.0
+
+    def most_likely(self, k: int) -> list[tuple[Hand, float]]:
+        """The `k` most likely hands with their probabilities; hands of weight 2 come first"""
+        doubled = self.candidates & self.table.double_weight
+        ordered = itertools.chain(iter_bits(doubled), iter_bits(self.candidates & ~doubled))
+        return [(self.table.hand(idx), self.probability(idx)) for idx in itertools.islice(ordered, k)]
+
+    @functools.cached_property
+    def num_opponent_candidates(self) -> float:
+        """
+        Number of candidates of my hand from the opponent's view,
+        i.e. the hands consistent with my answers and disjoint from the opponent's hand,
+        averaged over my candidates of the opponent's hand
+        """
+        universe = self.table.universe
+        total = 0
+        for idx in iter_bits(self.candidates):
+            total += self.calc_case(idx) * (self.revealed & universe.disjoint_from(universe.masks[idx])).bit_count()
+        return total / max(1, self.table.weight(self.candidates))
+
+    def partition(self, question: Question) -> Partition:
+        return self.table.partition(self.candidates, question)
 
     def calc_entropy(self, question: Question) -> float:
-        groups = self.groupby(question)
-        cases = [sum(map(self.calc_case, group)) for group in groups.values()]
-        return utility.calc_entropy(cases)
+        return self.partition(question).entropy
 
     def possible_questions(self):
         questions = itertools.chain.from_iterable(map(lambda qc: qc.to_questions(), self.question_cards_in_field))
         return list(questions)
 
+    def trash_question_card(self, question: Question) -> tuple[tuple[QuestionCard, ...], tuple[QuestionCard, ...]]:
+        """Returns the field and the trash after the card of the question is used"""
+        # cards are shared instances (see `cards`)
+        used = tuple(qc for qc in self.question_cards_in_field if qc is question.question_card)
+        field = tuple(qc for qc in self.question_cards_in_field if qc is not question.question_card)
+        return field, self.question_cards_in_trash + used
+
     def narrow_by_qa(self, question: Question, answer: Answer):
-        groups = self.groupby(question)
-        next_state = self.copy()
-        next_state.candidates = groups[answer.value]
-        for i, qc in enumerate(self.question_cards_in_field):
-            if question.question_card.id == qc.id:
-                next_state.question_cards_in_field.pop(i)
-                next_state.question_cards_in_trash.append(qc)
-        next_state.last_action = f"narrowed by question {question} and answer {answer}"
-        return next_state
+        child = self.children.get((question, answer))
+        if child is None:
+            child = self.children[(question, answer)] = self.narrowed_by_qa(question, answer)
+        return child
+
+    def answered(self, question: Question, answer: Answer) -> int:
+        """The candidates giving the answer to the question, a single AND with the answer index"""
+        if answer.type != question.type:
+            return 0
+        return self.table.narrow(self.candidates, question, answer.code)
+
+    def is_possible_answer(self, question: Question, answer: Answer) -> bool:
+        """Whether some candidate gives the answer to the question"""
+        return self.answered(question, answer) != 0
+
+    def narrowed(self, question: Question, answer: Answer) -> tuple[int, int]:
+        """The candidates giving the answer and their total weight; raises `ValueError` if there is none"""
+        candidates = self.answered(question, answer)
+        if candidates == 0:
+            raise ValueError(f"no candidate gives answer {answer} to question {question}")
+        return candidates, self.table.weight(candidates)
+
+    def narrowed_by_qa(self, question: Question, answer: Answer):
+        candidates, total_weight = self.narrowed(question, answer)
+        field, trash = self.trash_question_card(question)
+        revealed = self.revealed
+        if question.type == QuestionType.SHARED:
+            # everyone answers a shared question
+            revealed &= self.table.revealed_by(question)
+        return self.copy(
+            candidates,
+            question_cards_in_field=field,
+            question_cards_in_trash=trash,
+            last_action=f"narrowed by question {question} and answer {answer}",
+            revealed=revealed,
+            total_weight=total_weight,
+        )
+
+    def what_if(self, question: Question) -> list["WhatIf"]:
+        """Every possible answer to the question with the next state and its ranking, the most likely answer first"""
+        if question not in self.what_ifs:
+            partition = self.partition(question)
+            total = sum(partition.cases.values())
+            what_ifs = []
+            for code, cases in partition.cases.items():
+                answer = Answer.from_code(question.type, code)
+                what_ifs.append(WhatIf(answer, cases / total, self.narrow_by_qa(question, answer)))
+            self.what_ifs[question] = sorted(what_ifs, key=lambda what_if: -what_if.probability)
+        return self.what_ifs[question]
 
     def opponent_ask(self, question: Question, answer: Answer | None):
-        next_state = self.copy()
+        candidates, total_weight = self.candidates, self.total_weight
         if question.type == QuestionType.SHARED:
             assert answer is not None
-            groups = self.groupby(question)
-            next_state.candidates = groups[answer.value]
-        for i, qc in enumerate(self.question_cards_in_field):
-            if question.question_card.id == qc.id:
-                next_state.question_cards_in_field.pop(i)
-                next_state.question_cards_in_trash.append(qc)
-        next_state.last_action = f"opponent asked question {question}{f' and answer {answer} narrows' if answer else ''}"
-        return next_state
+            candidates, total_weight = self.narrowed(question, answer)
+        field, trash = self.trash_question_card(question)
+        return self.copy(
+            candidates,
+            question_cards_in_field=field,
+            question_cards_in_trash=trash,
+            last_action=f"opponent asked question {question}{f' and answer {answer} narrows' if answer else ''}",
+            revealed=self.revealed & self.table.revealed_by(question),
+            total_weight=total_weight,
+        )
 
     def add_question_card(self, idx: int):
         assert 0 <= idx < len(self.question_cards_in_deck)
-        next_state = self.copy()
-        qc = next_state.question_cards_in_deck.pop(idx)
-        next_state.question_cards_in_field.append(qc)
-        next_state.last_action = f"added question card `{qc.id}`"
-        return next_state
+        qc = self.question_cards_in_deck[idx]
+        return self.copy(
+            question_cards_in_deck=self.question_cards_in_deck[:idx] + self.question_cards_in_deck[idx + 1 :],
+            question_cards_in_field=self.question_cards_in_field + (qc,),
+            last_action=f"added question card `{qc.id}`",
+        )
+
+
+class WhatIf:
+    def __init__(self, answer: Answer, probability: float, state: State):
+        self.answer = answer
+        self.probability = probability
+        self.state = state
+        # questions of the next turn by descending entropy (the partitions are cached for when the answer comes)
+        self.ranking = sorted(((q, state.calc_entropy(q)) for q in state.possible_questions()), key=lambda item: -item[1])
+
+    def __repr__(self):
+        return f"WhatIf<{self.answer}, {self.probability:.3f}, {self.state.num_candidates()} candidates>"
@@ -0,0 +1,9 @@
+import init_phase
+from utility import Hand
+
+"""Helpers of the tests, imported as `tests.helpers`"""
+
+
+def parse_hand(spec: str) -> Hand:
+    """`parse_hand("1r 2b 5 7b 9r")` is the hand of the tiles as typed in the game"""
+    return Hand([init_phase.parse_tile(tile) for tile in spec.split()])
@@ -0,0 +1,64 @@
+import pytest
+
+import advisor
+import endgame
+from endgame import Solution
+from planner import BITS_PER_TURN, Plan, estimate_turns
+from state import State
+
+
+@pytest.fixture
+def state(make_state):
+    return make_state("1r 2b 5 7b 9r", "count_red", "sum_3_left")
+
+
+def few_candidates(state: State, count: int) -> State:
+    candidates = 0
+    for idx in range(count):
+        candidates |= 1 << idx
+    return state.copy(candidates, total_weight=state.table.weight(candidates))
+
+
+def test_keep_probability_weighs_both_sides():
+    top = [(None, 0.4)]
+    # the opponent needs many more turns than we do: keep asking
+    advice = advisor.SubmitAdvice(top, 1.0, "estimate", 9.0)
+    assert advice.keep_probability == pytest.approx(0.9)
+    assert not advice.should_submit()
+    # the same win probability, but we need more turns than the opponent: submit
+    advice = advisor.SubmitAdvice(top, 4.0, "estimate", 1.0)
+    assert advice.keep_probability == pytest.approx(0.5**4)
+    assert advice.should_submit()
+    # the opponent already knows my hand
+    assert advisor.SubmitAdvice(top, 1.0, "estimate", 0.0).should_submit()
+
+
+def test_estimate_opponent_turns():
+    assert advisor.estimate_opponent_turns(1.0) == 0.0
+    assert advisor.estimate_opponent_turns(2.0) == 1.0
+    assert advisor.estimate_opponent_turns(2.0**30) == pytest.approx(30 / BITS_PER_TURN)
+
+
+def test_advise_sources(state):
+    question = state.possible_questions()[0]
+    plan = Plan(question, 2.5, 2)
+    solution = Solution(question, 1.5, 3, 0)
+    assert advisor.advise(state).source == "estimate"
+    assert advisor.advise(state).expected_turns == estimate_turns(state.candidates)
+    assert advisor.advise(state, plan).expected_turns == 2.5
+    # the solution is only used in the endgame
+    assert advisor.advise(state, plan, solution).source == "planner"
+    small = few_candidates(state, endgame.ENDGAME_THRESHOLD)
+    advice = advisor.advise(small, plan, solution)
+    assert advice.source == "endgame" and advice.expected_turns == 1.5
+    assert advisor.advise(small, plan).source == "planner"
+
+
+def test_advise_top(state):
+    small = few_candidates(state, 3)
+    advice = advisor.advise(small, k=5)
+    assert len(advice.top) == 3
+    assert sum(probability for _, probability in advice.top) == pytest.approx(1.0)
+    assert advice.win_probability == max(probability for _, probability in advice.top)
+    # nothing is revealed about my hand yet
+    assert advice.opponent_turns == advisor.estimate_opponent_turns(small.num_opponent_candidates) > 1.0
@@ -0,0 +1,46 @@
+import collections
+import itertools
+
+import pytest
+
+from answer_table import AnswerTable
+from qanda import encode_answer_value
+from tests.helpers import parse_hand
+from utility import NUM_TILES, Hand, Tile, calc_entropy, iter_bits
+
+"""Partitions of the answer table against the original grouping, asking every hand made of the other tiles"""
+
+
+def other_tiles(hand: Hand) -> list[Tile]:
+    tiles = [Tile.from_index(idx) for idx in range(NUM_TILES)]
+    for tile in hand.tiles:
+        tiles.remove(tile)
+    return tiles
+
+
+@pytest.mark.parametrize("spec", ["1r 2b 5 7b 9r", "0r 0b 3r 4b 8b", "5 5 6r 7b 9b"])
+def test_partitions_match_baseline(question_cards, spec):
+    hand = parse_hand(spec)
+    table = AnswerTable(hand)
+    # the two green 5s are distinct tiles here, so a hand with one of them is asked twice
+    opponent_hands = [Hand(list(tiles)) for tiles in itertools.combinations(other_tiles(hand), 5)]
+    assert table.weight(table.all) == len(opponent_hands)
+    for question in (question for card in question_cards for question in card.to_questions()):
+        cases: collections.Counter[int] = collections.Counter()
+        masks: dict[int, set[int]] = collections.defaultdict(set)
+        for opponent_hand in opponent_hands:
+            code = encode_answer_value(question.ask(opponent_hand))
+            cases[code] += 1
+            masks[code].add(opponent_hand.mask())
+        partition = table.partition(table.all, question)
+        assert partition.cases == dict(cases)
+        assert partition.sizes == {code: len(group) for code, group in masks.items()}
+        assert {code: {table.masks[idx] for idx in iter_bits(group)} for code, group in partition.groups.items()} == masks
+        assert partition.entropy == pytest.approx(calc_entropy(list(cases.values())))
+
+
+def test_partition_cache(question_cards):
+    table = AnswerTable(parse_hand("1r 2b 5 7b 9r"))
+    question = question_cards[0].to_questions()[0]
+    assert table.partition(table.all, question) is table.partition(table.all, question)
+    assert table.cache.hits == 1
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+import deck_ranking
+from background import BackgroundRanker
+
+
+@pytest.fixture
+def ranker():
+    ranker = BackgroundRanker()
+    yield ranker
+    ranker.shutdown()
+
+
+def listen(ranker: BackgroundRanker) -> tuple[list, threading.Event]:
+    notified: list = []
+    event = threading.Event()
+
+    def listener(state):
+        notified.append(state)
+        event.set()
+
+    ranker.set_listener(listener)
+    return notified, event
+
+
+def test_published_results_are_notified(ranker, make_state):
+    state = make_state("1r 2b 5 7b 9r", "count_red", "sum_blue")
+    ranker.deck_aware = True
+    notified, event = listen(ranker)
+    ranker.submit(state)
+    assert event.wait(30)
+    assert notified == [state]
+    assert ranker.deck_scores_for(state) is not None
+    assert ranker.error_for(state) is None
+
+
+def test_worker_exception_is_kept(ranker, make_state, monkeypatch):
+    def fail(state, cancelled):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(deck_ranking, "deck_aware_scores", fail)
+    state = make_state("1r 2b 5 7b 9r", "count_red")
+    ranker.deck_aware = True
+    notified, event = listen(ranker)
+    ranker.submit(state)
+    assert event.wait(30)
+    assert notified == [state]
+    error = ranker.error_for(state)
+    assert isinstance(error, RuntimeError) and str(error) == "boom"
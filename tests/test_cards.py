@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+import cards
+from qanda import QuestionCardId
+
+
+def write_cards(path, texts: dict[str, str]) -> None:
+    path.write_text(json.dumps([{"id": qcid, "ja": text, "en": text} for qcid, text in texts.items()]))
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "questions.json"
+    write_cards(path, {"count_red": "red", "count_blue": "blue"})
+    return path
+
+
+def fail_to_parse(path):
+    raise AssertionError("parsed despite the cache")
+
+
+def test_cache_is_reused(path, monkeypatch):
+    data = cards.load_data(str(path))
+    assert data == [("count_red", "red", "red"), ("count_blue", "blue", "blue")]
+    assert os.path.exists(cards.cache_path(str(path)))
+    monkeypatch.setattr(cards, "parse", fail_to_parse)
+    assert cards.load_data(str(path)) == data
+
+
+def test_cache_is_invalidated_by_the_source(path):
+    cards.load_data(str(path))
+    # the same size, but a later mtime
+    stat = path.stat()
+    write_cards(path, {"count_red": "RED", "count_blue": "BLUE"})
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cards.load_data(str(path))[0] == ("count_red", "RED", "RED")
+    # the same mtime, but another size
+    stat = path.stat()
+    write_cards(path, {"count_red": "reds"})
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cards.load_data(str(path)) == [("count_red", "reds", "reds")]
+
+
+def test_cache_of_another_version(path, monkeypatch):
+    cards.load_data(str(path))
+    monkeypatch.setattr(cards, "CACHE_VERSION", cards.CACHE_VERSION + 1)
+    monkeypatch.setattr(cards, "parse", lambda _: [("count_red", "parsed", "parsed")])
+    assert cards.load_data(str(path)) == [("count_red", "parsed", "parsed")]
+
+
+def test_corrupted_cache(path):
+    cards.load_data(str(path))
+    with open(cards.cache_path(str(path)), "wb") as f:
+        f.write(b"not a pickle")
+    assert cards.load_data(str(path))[1] == ("count_blue", "blue", "blue")
+
+
+def test_unknown_card(path):
+    write_cards(path, {"count_red": "red", "no_such_card": "?"})
+    with pytest.raises(cards.InvalidQuestionCards, match="no_such_card"):
+        cards.load_data(str(path))
+
+
+def test_duplicated_card(path):
+    path.write_text(json.dumps([{"id": "count_red", "ja": "red", "en": "red"}] * 2))
+    with pytest.raises(cards.InvalidQuestionCards, match="duplicated"):
+        cards.load_data(str(path))
+
+
+def test_registry_shares_cards(path):
+    question_cards = cards.question_cards(str(path))
+    assert [card.id for card in question_cards] == [QuestionCardId("count_red"), QuestionCardId("count_blue")]
+    assert cards.question_cards(str(path)) is question_cards
@@ -0,0 +1,127 @@
+import functools
+import math
+import time
+
+import pytest
+
+import endgame
+from planner import card_questions, estimate_turns, search_keys
+from qanda import Answer, QuestionCardId
+from state import State
+
+"""The endgame solver against a plain expectimax over the same game model, without pruning nor spare cards"""
+
+HAND = "1r 2b 5 7b 9r"
+
+
+def endgame_state(make_state, asked: list[str], field: list[str], deck: list[str]) -> State:
+    """The candidates after the questions of `asked` are answered by the opponent's hand `0r 3b 4r 6b 8r`"""
+    state = make_state(HAND, *asked)
+    opponent = make_state("0r 3b 4r 6b 8r").hand
+    for _ in asked:
+        question = state.possible_questions()[0]
+        state = state.narrow_by_qa(question, Answer(question.type, question.ask(opponent)))
+    cards = {card.id.value: card for card in state.question_cards_in_deck}
+    return State(
+        state.hand,
+        state.candidates,
+        tuple(cards[qcid] for qcid in deck),
+        tuple(cards[qcid] for qcid in field),
+        (),
+        state.table,
+    )
+
+
+class Expectimax:
+    """Expected turns over every question and draw; `depth` limits the questions as in `EndgameSolver.value`"""
+
+    def __init__(self, state: State, solver: endgame.EndgameSolver):
+        self.table = state.table
+        self.solver = solver
+        self.keys = card_questions(state)
+        self.value = functools.lru_cache(maxsize=None)(self.value)
+
+    def leaf(self, candidates: int) -> float:
+        return max(self.solver.lower_bound(candidates), estimate_turns(candidates))
+
+    def question_value(
+        self, groups: list[int], card: QuestionCardId, field: frozenset, deck: frozenset, depth: int | float
+    ) -> float:
+        total = self.table.weight(sum(groups))
+        expected = 1.0
+        for group in groups:
+            if len(deck) == 0:
+                turns = self.value(group, field - {card}, deck, depth - 1)
+            else:
+                draws = [self.value(group, field - {card} | {drawn}, deck - {drawn}, depth - 1) for drawn in deck]
+                turns = sum(draws) / len(deck)
+            expected += self.table.weight(group) / total * turns
+        return expected
+
+    def value(self, candidates: int, field: frozenset, deck: frozenset, depth: int | float) -> float:
+        if candidates.bit_count() <= 1:
+            return 0.0
+        splitting = [
+            (card, groups)
+            for card in field
+            for key in self.keys[card]
+            if len(groups := list(self.table.groupby(candidates, key).values())) > 1
+        ]
+        if len(splitting) == 0:
+            if len(field) == 0 or len(deck) == 0:
+                return self.leaf(candidates)
+            # ask any question, only to draw a new card
+            splitting = [(next(iter(field)), [candidates])]
+        if depth == 0:
+            return self.leaf(candidates)
+        return min(self.question_value(groups, card, field, deck, depth) for card, groups in splitting)
+
+
+POSITIONS = [
+    (
+        ["sum_3_left", "sum_blue"],
+        ["count_red", "where_0", "sum_3_right"],
+        ["where_5", "count_pairs", "shared_center_45"],
+    ),
+    (
+        ["count_blue", "sum_red", "where_34"],
+        ["where_12", "sum_3_middle"],
+        ["where_89", "count_even", "shared_diff_min_max"],
+    ),
+    (["sum_3_middle", "sum_red"], ["count_odd", "where_sequential", "where_67"], []),
+]
+
+
+@pytest.mark.parametrize("asked, field, deck", POSITIONS)
+def test_solve_against_brute_force(make_state, asked, field, deck):
+    state = endgame_state(make_state, asked, field, deck)
+    assert 1 < state.num_candidates() <= endgame.ENDGAME_THRESHOLD
+    solution = endgame.solve(state, budget=60.0)
+    assert solution is not None and solution.complete()
+    solver = endgame.EndgameSolver(state.table, card_questions(state), time.time() + 60.0)
+    expectimax = Expectimax(state, solver)
+    candidates, field_ids, deck_ids = search_keys(state)
+    assert solution.expected_turns == pytest.approx(expectimax.value(candidates, field_ids, deck_ids, math.inf))
+    question = solution.question
+    groups = list(state.table.groupby(candidates, question.key()).values())
+    chosen = expectimax.question_value(groups, question.key()[0], field_ids, deck_ids, math.inf)
+    assert solution.expected_turns == pytest.approx(chosen)
+
+
+@pytest.mark.parametrize("asked, field, deck", POSITIONS)
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_depth_limited_values(make_state, asked, field, deck, depth):
+    state = endgame_state(make_state, asked, field, deck)
+    solver = endgame.EndgameSolver(state.table, card_questions(state), time.time() + 60.0)
+    candidates, field_ids, deck_ids = search_keys(state)
+    position = (candidates, field_ids, 0, deck_ids, 0)
+    # the entries of the other depths are in the table
+    for searched in (3, 2, 1):
+        solver.value(position, math.inf, searched)
+    solver.flags = 0
+    value = solver.value(position, math.inf, depth)
+    expectimax = Expectimax(state, solver)
+    assert value == pytest.approx(expectimax.value(candidates, field_ids, deck_ids, depth))
+    # a value not cut at the depth is the exact one
+    if not solver.flags & endgame.CUT:
+        assert value == pytest.approx(expectimax.value(candidates, field_ids, deck_ids, math.inf))
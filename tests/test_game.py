@@ -0,0 +1,58 @@
+from game import Game
+from qanda import Answer
+
+
+def snapshot(state) -> tuple:
+    return (
+        state.candidates,
+        state.total_weight,
+        state.revealed,
+        tuple(card.id for card in state.question_cards_in_deck),
+        tuple(card.id for card in state.question_cards_in_field),
+        tuple(card.id for card in state.question_cards_in_trash),
+        state.last_action,
+    )
+
+
+def test_undo_redo_keeps_states_intact(make_state):
+    game = Game(make_state("1r 2b 5 7b 9r"), background=False)
+    snapshots = [snapshot(game.current_state())]
+    game.add_question_card(0)
+    game.add_question_card(5)
+    snapshots += [snapshot(state) for state in game.history[1:]]
+    question = game.current_state().possible_questions()[-1]
+    code = next(iter(game.current_state().partition(question).groups))
+    game.narrow_by_qa(question, Answer.from_code(question.type, code))
+    snapshots.append(snapshot(game.current_state()))
+    assert snapshots[-1][0] != snapshots[-2][0]
+
+    assert game.undo() and game.undo()
+    assert snapshot(game.current_state()) == snapshots[1]
+    assert [snapshot(state) for state in game.future] == [snapshots[3], snapshots[2]]
+    assert game.redo()
+    assert snapshot(game.current_state()) == snapshots[2]
+    assert game.redo() and not game.redo()
+    assert [snapshot(state) for state in game.history] == snapshots
+    while game.undo():
+        pass
+    assert snapshot(game.current_state()) == snapshots[0]
+    game.finish()
+
+
+def test_new_action_clears_redo(make_state):
+    game = Game(make_state("1r 2b 5 7b 9r"), background=False)
+    game.add_question_card(0)
+    assert game.undo() and len(game.future) == 1
+    game.add_question_card(1)
+    assert len(game.future) == 0 and not game.redo()
+    game.finish()
+
+
+def test_actions_do_not_modify_the_state(make_state):
+    state = make_state("1r 2b 5 7b 9r", "count_red", "where_5")
+    before = snapshot(state)
+    question = state.possible_questions()[0]
+    state.narrow_by_qa(question, Answer(question.type, 2))
+    state.opponent_ask(state.possible_questions()[1], None)
+    state.add_question_card(0)
+    assert snapshot(state) == before
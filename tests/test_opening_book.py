@@ -0,0 +1,46 @@
+import pytest
+
+import opening_book
+import universe
+from qanda import Answer
+from state import State
+from utility import Hand
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory) -> opening_book.OpeningBook:
+    path = str(tmp_path_factory.mktemp("book") / "opening_book.bin")
+    assert opening_book.build(path, limit=2, max_workers=1) == 2
+    return opening_book.OpeningBook(path)
+
+
+def test_opening_entry(book, question_cards):
+    hand = Hand.from_mask(sorted(universe.all_hand_masks())[0])
+    state = State(hand, question_cards_in_deck=question_cards)
+    entry = book.lookup(state)
+    assert entry is not None
+    for question in (question for card in question_cards for question in card.to_questions()):
+        partition = state.partition(question)
+        score = entry.scores[question.key()]
+        assert score.entropy == pytest.approx(partition.entropy, abs=1e-5)
+        assert (score.max_size, score.num_groups) == (partition.max_size, len(partition.groups))
+    assert entry.best == max(entry.scores, key=lambda key: entry.scores[key].entropy)
+
+
+def test_best_in_field(book, question_cards):
+    state = State(Hand.from_mask(sorted(universe.all_hand_masks())[1]), question_cards_in_deck=question_cards)
+    entry = book.lookup(state)
+    assert entry is not None
+    field = [key for key in entry.scores if key != entry.best][:6]
+    assert entry.best_in(field) == max(field, key=lambda key: entry.scores[key].entropy)
+    assert entry.best_in(field + [entry.best]) == entry.best
+    assert entry.best_in([]) is None
+
+
+def test_no_entry_after_the_opening(book, question_cards):
+    state = State(Hand.from_mask(sorted(universe.all_hand_masks())[0]), question_cards_in_deck=question_cards)
+    ids = [card.id.value for card in state.question_cards_in_deck]
+    state = state.add_question_card(ids.index("count_red"))
+    question = state.possible_questions()[0]
+    assert book.lookup(state) is not None
+    assert book.lookup(state.narrow_by_qa(question, Answer(question.type, 2))) is None
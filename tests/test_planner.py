@@ -0,0 +1,62 @@
+import pytest
+
+import planner
+from background import BackgroundRanker
+
+
+@pytest.fixture
+def state(make_state):
+    return make_state("1r 2b 5 7b 9r", "count_red", "sum_3_left", "where_5", "count_pairs")
+
+
+def test_estimate_turns():
+    assert planner.estimate_turns(0) == planner.estimate_turns(0b1) == 0.0
+    assert planner.estimate_turns(0b11) == 1.0
+    assert planner.estimate_turns((1 << 512) - 1) == pytest.approx(9 / planner.BITS_PER_TURN)
+
+
+def test_plan_matches_in_process(state):
+    workers = planner.Planner(state, max_workers=1)
+    try:
+        progress = []
+        plan = workers.plan(state, budget=60.0, max_depth=2, on_progress=progress.append)
+    finally:
+        workers.shutdown()
+    assert plan is not None and plan.depth == 2
+    assert [p.depth for p in progress] == [1, 2]
+    local = planner.plan_in_process(state, budget=60.0, max_depth=2)
+    assert local is not None
+    assert plan.question == local.question
+    assert plan.expected_turns == pytest.approx(local.expected_turns)
+    # asking a question takes a turn, and one question cannot tell 3003 hands apart
+    assert 2.0 < plan.expected_turns < 5.0
+
+
+def fail(candidates, question_key):
+    raise RuntimeError("boom")
+
+
+def test_worker_exception_is_raised(state, monkeypatch):
+    # the workers are forked after the patch
+    monkeypatch.setattr(planner, "partition", fail)
+    workers = planner.Planner(state, max_workers=1)
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            workers.plan(state, budget=60.0)
+    finally:
+        workers.shutdown()
+
+
+def test_worker_exception_reaches_the_ranker(state, monkeypatch):
+    monkeypatch.setattr(planner, "partition", fail)
+    workers = planner.Planner(state, max_workers=1)
+    ranker = BackgroundRanker()
+    ranker.planner = workers
+    try:
+        ranker.submit(state)
+        ranker.futures[state].exception(timeout=60)
+        assert isinstance(ranker.error_for(state), RuntimeError)
+        assert ranker.plan_for(state) is None
+    finally:
+        ranker.shutdown()
+        workers.shutdown()
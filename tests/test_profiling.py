@@ -0,0 +1,30 @@
+import profiling
+
+
+def test_timed_disabled(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", False)
+
+    def function():
+        return 1
+
+    assert profiling.timed("test")(function) is function
+
+
+def test_timed_enabled(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "timings", dict())
+
+    @profiling.timed("test")
+    def function(x):
+        return x * 2
+
+    assert function(2) == 4 and function(3) == 6
+    timing = profiling.timings["test"]
+    assert timing.count == 2 and timing.total >= timing.last >= 0.0
+
+
+def test_profile_command(tmp_path):
+    with profiling.profile_command("question 0 answer 1 3", str(tmp_path)):
+        sum(range(1000))
+    (dump,) = tmp_path.iterdir()
+    assert dump.name.endswith("-question_0_answer_1_3.pstats")
@@ -0,0 +1,79 @@
+import pytest
+
+import qanda
+from qanda import NUM_ANSWER_CODES, Answer, QuestionCardId, QuestionType, bind_kernel, encode_answer_value, kernel_options
+
+
+def test_encode_where_answer():
+    assert encode_answer_value(()) == 0
+    assert encode_answer_value((0, 2, 4)) == 0b10101
+    assert encode_answer_value((4, 0)) == 0b10001
+
+
+def test_encode_other_answers():
+    assert encode_answer_value(0) == 0
+    assert encode_answer_value(23) == 23
+
+
+def test_encode_duplicated_positions():
+    with pytest.raises(ValueError):
+        encode_answer_value((1, 1))
+    with pytest.raises(ValueError):
+        Answer(QuestionType.WHERE, (0, 3, 0))
+
+
+@pytest.mark.parametrize("code", range(32))
+def test_where_answer_roundtrip(code):
+    answer = Answer.from_code(QuestionType.WHERE, code)
+    assert answer.code == code
+    assert Answer(QuestionType.WHERE, answer.value) == answer
+    assert list(answer.value) == sorted(answer.value)
+
+
+@pytest.mark.parametrize("type", [QuestionType.COUNT, QuestionType.SUM, QuestionType.SHARED])
+def test_int_answer_roundtrip(type):
+    for code in range(NUM_ANSWER_CODES):
+        answer = Answer.from_code(type, code)
+        assert answer.value == answer.code == code
+
+
+def test_answer_equality():
+    assert Answer(QuestionType.WHERE, (3, 1)) == Answer(QuestionType.WHERE, (1, 3))
+    assert hash(Answer(QuestionType.WHERE, (3, 1))) == hash(Answer(QuestionType.WHERE, (1, 3)))
+    assert Answer(QuestionType.COUNT, 2) != Answer(QuestionType.SUM, 2)
+
+
+@pytest.mark.parametrize(
+    "type, value",
+    [
+        (QuestionType.WHERE, (5,)),
+        (QuestionType.WHERE, (-1,)),
+        (QuestionType.WHERE, 3),
+        (QuestionType.COUNT, -1),
+        (QuestionType.SUM, NUM_ANSWER_CODES),
+        (QuestionType.SUM, (1,)),
+    ],
+)
+def test_invalid_answers(type, value):
+    with pytest.raises(ValueError):
+        Answer(type, value)
+
+
+def test_answer_is_immutable():
+    answer = Answer(QuestionType.COUNT, 2)
+    with pytest.raises(AttributeError):
+        answer.value = 3  # type: ignore
+
+
+def test_unregistered_kernel(monkeypatch):
+    monkeypatch.delitem(qanda._kernels, QuestionCardId.COUNT_PAIRS)
+    with pytest.raises(KeyError, match="count_pairs"):
+        kernel_options(QuestionCardId.COUNT_PAIRS)
+    with pytest.raises(KeyError, match="count_pairs"):
+        bind_kernel(QuestionCardId.COUNT_PAIRS, None)
+
+
+def test_invalid_kernel_option():
+    assert kernel_options(QuestionCardId.WHERE_12) == (1, 2)
+    with pytest.raises(ValueError):
+        bind_kernel(QuestionCardId.WHERE_12, 3)
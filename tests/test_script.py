@@ -0,0 +1,29 @@
+import pytest
+
+import cards
+import script
+
+
+@pytest.fixture
+def runner(question_cards, monkeypatch):
+    monkeypatch.setattr(cards, "question_cards", lambda: question_cards)
+    runner = script.ScriptRunner()
+    yield runner
+    runner.close()
+
+
+def test_malformed_hand_keeps_game(runner):
+    runner.execute("hand 1r 2b 5 7b 9r")
+    runner.execute("add count_red")
+    with pytest.raises(script.ScriptError):
+        runner.execute("hand 1r 2b 5 7b")
+    state = runner.execute("question 0 answer 2")
+    assert state is not None and 0 < state.num_candidates() < 3003
+
+
+def test_records(runner):
+    lines = ["# comment", "hand 1r 2b 5 7b 9r", "", "add count_red", "question 0 answer 9", "bogus"]
+    records = list(runner.run(lines))
+    assert [record["line"] for record in records] == [2, 4, 5, 6]
+    assert records[1]["candidates"] == 3003 and records[1]["ranking"][0]["question"] == "count_red"
+    assert "error" in records[2] and "error" in records[3]
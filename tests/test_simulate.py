@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+import simulate
+
+
+@pytest.fixture
+def in_cards_dir(questions_path, monkeypatch):
+    # the simulator deals from the default `questions.json`
+    monkeypatch.chdir(questions_path.parent)
+
+
+def test_deal_hands():
+    hand, opponent_hand = simulate.deal_hands(random.Random(0))
+    assert len(hand.tiles) == len(opponent_hand.tiles) == 5
+    assert (hand.tiles, opponent_hand.tiles) == tuple(hand.tiles for hand in simulate.deal_hands(random.Random(0)))
+
+
+@pytest.mark.parametrize("strategy_name", list(simulate.STRATEGIES))
+def test_play_is_reproducible(in_cards_dir, strategy_name):
+    results = [simulate.play(seed, strategy_name) for seed in range(2)]
+    assert results == [simulate.play(seed, strategy_name) for seed in range(2)]
+    assert all(turns is None or 1 <= turns <= simulate.MAX_TURNS for turns in results)
+
+
+def test_simulate_matches_play(in_cards_dir):
+    results = simulate.simulate("lookahead", 2, first_seed=3, max_workers=1)
+    assert results == [simulate.play(seed, "lookahead") for seed in (3, 4)]
+
+
+def test_report():
+    report = simulate.report("entropy", [3, 4, None, 3])
+    assert report["games"] == 4 and report["unsolved"] == 1
+    assert report["mean"] == pytest.approx(10 / 3)
+    assert report["median"] == 3
+    assert report["distribution"] == {3: 2, 4: 1}
@@ -0,0 +1,103 @@
+import pytest
+
+from qanda import Answer, QuestionType
+from utility import FIVES_MASK, Hand, iter_bits
+
+
+def test_narrow_by_qa(make_state):
+    state = make_state("1r 2b 5 7b 9r", "count_red")
+    question = state.possible_questions()[0]
+    partition = state.partition(question)
+    narrowed = state.narrow_by_qa(question, Answer(question.type, 2))
+    assert narrowed.candidates == partition.groups[2]
+    assert narrowed.total_weight == partition.cases[2]
+    assert narrowed.question_cards_in_field == ()
+    assert [card.id.value for card in narrowed.question_cards_in_trash] == ["count_red"]
+
+
+@pytest.mark.parametrize("qcid, answer", [("count_red", 9), ("sum_red", 60), ("where_0", (0, 1, 2))])
+def test_impossible_answer(make_state, qcid, answer):
+    state = make_state("1r 2b 5 7b 9r", qcid)
+    question = state.possible_questions()[0]
+    assert not state.is_possible_answer(question, Answer(question.type, answer))
+    with pytest.raises(ValueError):
+        state.narrow_by_qa(question, Answer(question.type, answer))
+    assert len(state.children) == 0
+
+
+def test_impossible_shared_answer(make_state):
+    state = make_state("1r 2b 5 7b 9r", "shared_center_45")
+    question = state.possible_questions()[0]
+    with pytest.raises(ValueError):
+        state.opponent_ask(question, Answer(QuestionType.SHARED, 3))
+    narrowed = state.opponent_ask(question, Answer(QuestionType.SHARED, 5))
+    assert 0 < narrowed.num_candidates() < state.num_candidates()
+
+
+def test_narrowing_does_not_partition(make_state):
+    state = make_state("1r 2b 5 7b 9r", "count_red", "shared_sum_all")
+    count_red, shared_sum_all = state.possible_questions()
+    state.table.cache.clear()
+    assert state.is_possible_answer(count_red, Answer(QuestionType.COUNT, 2))
+    narrowed = state.narrow_by_qa(count_red, Answer(QuestionType.COUNT, 2))
+    narrowed = narrowed.opponent_ask(shared_sum_all, Answer(QuestionType.SHARED, 25))
+    assert len(state.table.cache.entries) == 0 and state.table.cache.misses == 0
+    expected = state.partition(count_red).groups[2] & state.table.index[shared_sum_all.key()][25]
+    assert narrowed.candidates == expected
+    assert narrowed.total_weight == state.table.weight(expected)
+
+
+def test_answer_of_another_type(make_state):
+    state = make_state("1r 2b 5 7b 9r", "count_red")
+    question = state.possible_questions()[0]
+    assert not state.is_possible_answer(question, Answer(QuestionType.SUM, 2))
+
+
+def test_what_if(make_state):
+    state = make_state("1r 2b 5 7b 9r", "count_red", "sum_3_left")
+    question = state.possible_questions()[0]
+    what_ifs = state.what_if(question)
+    assert state.what_if(question) is what_ifs
+    partition = state.partition(question)
+    assert sorted(what_if.answer.code for what_if in what_ifs) == sorted(partition.groups)
+    assert sum(what_if.probability for what_if in what_ifs) == pytest.approx(1.0)
+    assert [what_if.probability for what_if in what_ifs] == sorted((w.probability for w in what_ifs), reverse=True)
+    for what_if in what_ifs:
+        # the hypothetical state is the one the answer leads to
+        assert what_if.state is state.narrow_by_qa(question, what_if.answer)
+        assert what_if.probability == pytest.approx(what_if.state.total_weight / state.total_weight)
+        assert [q for q, _ in what_if.ranking] == sorted(
+            what_if.state.possible_questions(), key=lambda q: -what_if.state.calc_entropy(q)
+        )
+        assert all(q.question_card.id.value == "sum_3_left" for q, _ in what_if.ranking)
+
+
+def can_hold_both(mask: int, other: int) -> bool:
+    """Whether two hands can be dealt together; there are two green 5s"""
+    return mask & other & ~FIVES_MASK == 0 and (mask & FIVES_MASK).bit_count() + (other & FIVES_MASK).bit_count() <= 2
+
+
+def test_opponent_tracker(make_state):
+    state = make_state("1r 2b 5 7b 9r", "count_red", "shared_sum_all", "sum_3_left")
+    universe = state.table.universe
+    assert state.revealed == universe.all
+    count_red, shared_sum_all, sum_3_left = state.possible_questions()
+    # my own question tells the opponent nothing
+    asked = state.narrow_by_qa(count_red, Answer(QuestionType.COUNT, 2))
+    assert asked.revealed == universe.all
+    # the opponent's question reveals my answer, a shared question narrows both sides
+    asked = asked.opponent_ask(sum_3_left, None)
+    asked = asked.opponent_ask(shared_sum_all, Answer(QuestionType.SHARED, 25))
+    assert 0 < asked.revealed.bit_count() < universe.all.bit_count()
+    for question in (sum_3_left, shared_sum_all):
+        mine = question.ask(state.hand)
+        assert all(question.ask(Hand.from_mask(universe.masks[idx])) == mine for idx in iter_bits(asked.revealed))
+    assert asked.revealed >> universe.positions[state.hand.mask()] & 1
+    # averaged over my candidates of the opponent's hand
+    expected = sum(
+        asked.calc_case(idx)
+        * sum(can_hold_both(universe.masks[idx], universe.masks[other]) for other in iter_bits(asked.revealed))
+        for idx in iter_bits(asked.candidates)
+    )
+    assert asked.num_opponent_candidates == pytest.approx(expected / asked.total_weight)
+    assert asked.num_opponent_candidates < state.num_opponent_candidates
@@ -0,0 +1,22 @@
+import itertools
+
+import init_phase
+import universe
+from utility import NUM_TILES, Hand, Tile, tiles_to_mask
+
+
+def all_tiles() -> list[Tile]:
+    return [Tile.from_index(idx) for idx in range(NUM_TILES)]
+
+
+def test_enumerate_distinct_hands():
+    masks = universe.all_hand_masks()
+    expected = {tiles_to_mask(sorted(tiles)) for tiles in itertools.combinations(all_tiles(), 5)}
+    assert len(masks) == len(set(masks)) == len(expected) == 12444
+    assert set(masks) == expected
+
+
+def test_enumerate_in_ascending_order_of_tiles():
+    hands = [Hand.from_mask(mask) for mask in init_phase.enumerate_hands([(idx, 1) for idx in range(8)], 3)]
+    keys = [[tile.index() for tile in hand.tiles] for hand in hands]
+    assert keys == sorted(keys) and len(keys) == 56
@@ -0,0 +1,41 @@
+import pytest
+
+import universe
+from utility import FIVES_MASK, NUM_TILES, Color, Hand, Tile, iter_bits, tiles_to_mask, to_bitset
+
+
+def test_tile_index_roundtrip():
+    for idx in range(NUM_TILES):
+        tile = Tile.from_index(idx)
+        # both green 5s share the index 10
+        assert tile.index() == (10 if idx == 11 else idx)
+    assert Tile(5, Color.GREEN).index() == 10
+    assert Tile(3, Color.BLUE).index() == 7
+
+
+def test_hand_mask_roundtrip():
+    for mask in universe.all_hand_masks():
+        hand = Hand.from_mask(mask)
+        assert len(hand.tiles) == 5
+        assert hand.mask() == mask
+        assert Hand(list(reversed(hand.tiles))).mask() == mask
+
+
+@pytest.mark.parametrize(
+    "tiles, mask",
+    [
+        ([Tile(5, Color.GREEN)], 1 << 10),
+        ([Tile(5, Color.GREEN), Tile(5, Color.GREEN)], FIVES_MASK),
+        ([Tile(0, Color.RED), Tile(9, Color.BLUE)], 1 | 1 << 19),
+    ],
+)
+def test_tiles_to_mask(tiles, mask):
+    assert tiles_to_mask(tiles) == mask
+
+
+def test_bitsets():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b1010_0001)) == [0, 5, 7]
+    assert to_bitset([7, 0, 5]) == 0b1010_0001
+    big = to_bitset(range(0, 12444, 7))
+    assert list(iter_bits(big)) == list(range(0, 12444, 7))
@@ -0,0 +1,19 @@
+import pytest
+
+import universe
+import vectorized
+from qanda import encode_answer_value
+from utility import Hand
+
+pytest.importorskip("numpy")
+
+
+def test_kernels_match_answer_functions():
+    masks = universe.all_hand_masks()
+    hands = [Hand.from_mask(mask) for mask in masks]
+    nums, colors = vectorized.hand_arrays(masks)
+    for card in universe.all_question_cards():
+        for question in card.to_questions():
+            assert vectorized.has_kernel(question)
+            expected = bytes(encode_answer_value(answer) for answer in question.ask_many(hands))
+            assert vectorized.answer_codes(question, nums, colors) == expected, question.key()
@@ -1,12 +1,16 @@
-import os
-
+import contextlib
+import sys
+from typing import Callable, Iterator, Sequence
+
+import endgame
+import opening_book
+import profiling
+import screen
+from advisor import SubmitAdvice
+from background import BackgroundRanker
 from qanda import Answer, Question, QuestionCard, QuestionType
 from state import State
-from utility import Hand, colorize, entire_east_asian_width, ljust_east_asian
-
-
-def clear_view():
-    os.system("clear")
+from utility import Hand, ljust_by_width
 
 
 def print_border():
@@ -41,27 +45,24 @@ def input_where(message="") -> tuple[int, ...] | None:
         return tuple(lis)
 
 
-def aligned_question_cards(cards: list[QuestionCard]):
-    qc_id_max = 0
-    qc_desc_max = 0
-    for card in cards:
-        qc_id_max = max(qc_id_max, entire_east_asian_width(card.card_label()))
-        qc_desc_max = max(qc_desc_max, entire_east_asian_width(card.colored_description()))
+def aligned_question_cards(cards: Sequence[QuestionCard]):
+    qc_id_max = max((card.label_width for card in cards), default=0)
+    qc_desc_max = max((card.colored_width for card in cards), default=0)
     return [
-        [ljust_east_asian(card.card_label(), qc_id_max), ljust_east_asian(card.colored_description(), qc_desc_max)]
+        [ljust_by_width(card.label, card.label_width, qc_id_max), ljust_by_width(card.colored, card.colored_width, qc_desc_max)]
         for card in cards
     ]
 
 
-def show_question_cards(cards: list[QuestionCard], with_index=True):
+def show_question_cards(cards: Sequence[QuestionCard], with_index=True):
     aligned = aligned_question_cards(cards)
     id_width = len(str(len(cards) - 1)) + 2
     for idx, (qc_id, qc_desc) in enumerate(aligned):
         idx_str = f"[{idx}]".ljust(id_width, " ")
         if with_index:
-            print(f"{qc_id} {idx_str} {colorize(qc_desc)}")
+            print(f"{qc_id} {idx_str} {qc_desc}")
         else:
-            print(f"{qc_id} {colorize(qc_desc)}")
+            print(f"{qc_id} {qc_desc}")
 
 
 def show_question_cards_in_deck(state: State, with_index=True):
@@ -76,23 +77,98 @@ def show_question_cards_in_field(state: State, with_index=True):
     print_border()
 
 
-def show_possible_questions(state: State) -> list[Question]:
+def show_plan(state: State, questions: list[Question], ranker: BackgroundRanker):
+    plan = ranker.plan_for(state)
+    if plan is None:
+        print("Planner: searching...")
+    else:
+        idx = next(idx for idx, q in enumerate(questions) if q.key() == plan.question.key())
+        formatted_turns = "{:.3f}".format(plan.expected_turns)
+        print(f"Planner: [{idx}] {plan.question.colored_question_label()}")
+        print(f"    expected turns {formatted_turns} (lookahead {plan.depth})")
+    print_border()
+
+
+def show_endgame(state: State, questions: list[Question], ranker: BackgroundRanker):
+    finished, solution = ranker.solution_for(state)
+    if not finished:
+        print("Endgame: solving...")
+    elif solution is None:
+        print("Endgame: not solved within the time budget")
+    else:
+        idx = next(idx for idx, q in enumerate(questions) if q == solution.question)
+        formatted_turns = "{:.3f}".format(solution.expected_turns)
+        if solution.exact():
+            label = "exact"
+        elif solution.complete():
+            label = "estimated once the cards run out"
+        else:
+            label = f"lookahead {solution.depth}, searching deeper timed out"
+        print(f"Endgame: [{idx}] {solution.question.colored_question_label()}")
+        print(f"    expected turns {formatted_turns} ({label})")
+    print_border()
+
+
+@contextlib.contextmanager
+def live(state: State, render: Callable[[], object], prompt: str, ranker: BackgroundRanker | None) -> Iterator[None]:
+    """Redraws the frame and the prompt whenever the ranker publishes a result for the state during the block"""
+    if ranker is None:
+        yield
+        return
+
+    def redraw(updated: State) -> None:
+        if updated is not state:
+            return
+        with screen.frame():
+            render()
+        sys.stdout.write(prompt + " ")
+        sys.stdout.flush()
+
+    ranker.set_listener(redraw)
+    try:
+        yield
+    finally:
+        ranker.set_listener(None)
+
+
+@profiling.timed("ranking")
+def show_possible_questions(state: State, ranker: BackgroundRanker | None = None) -> list[Question]:
     questions = state.possible_questions()
-    qid_max = 0
+    qid_max = max((q.label_width for q in questions), default=0)
     id_width = len(str(len(questions) - 1)) + 2
-    for q in questions:
-        qid_max = max(qid_max, entire_east_asian_width(q.colored_question_label()))
-    print(f"Available {len(questions)} questions:")
+    book_entry = opening_book.lookup(state)
+    deck_aware = ranker is not None and ranker.deck_aware
+    deck_scores = ranker.deck_scores_for(state) if ranker is not None and deck_aware else None
+    book_best = book_entry.best_in([q.key() for q in questions]) if book_entry else None
+    print(f"Available {len(questions)} questions:{' (from the opening book, `*` is its best)' if book_entry else ''}")
+    if deck_aware:
+        print("Deck-aware: `Next` is the expected entropy of the best question after the replacement draw")
+        if deck_scores is None:
+            print("Deck-aware: computing...")
     print_border()
     for idx, q in enumerate(questions):
-        colored_id_aligned = ljust_east_asian(q.colored_question_label(), qid_max)
+        colored_id_aligned = ljust_by_width(q.colored_label, q.label_width, qid_max)
         idx_str = f"[{idx}]".ljust(id_width, " ")
-        entropy = state.calc_entropy(q)
-        formatted_entropy = "{:.3f}".format(entropy)
-        groups = state.groupby(q)
-        max_num = max(map(len, groups.values()))
-        print(f"{idx_str} {colored_id_aligned} {idx_str} Ent {formatted_entropy}, Max {max_num}")
+        score = book_entry.scores.get(q.key()) if book_entry else None
+        if score is None:
+            score = state.partition(q)
+        formatted_entropy = "{:.3f}".format(score.entropy)
+        deck_score = deck_scores.get(q.key()) if deck_scores else None
+        formatted_deck = f", Next {deck_score.follow_up:.3f}, Total {deck_score.total:.3f}" if deck_score else ""
+        formatted_best = " *" if book_best is not None and q.key() == book_best else ""
+        print(
+            f"{idx_str} {colored_id_aligned} {idx_str} Ent {formatted_entropy}, Max {score.max_size}{formatted_deck}{formatted_best}"
+        )
     print_border()
+    error = ranker.error_for(state) if ranker is not None else None
+    if error is not None:
+        print(f"!! Background ranking failed: {type(error).__name__}: {error}")
+        print_border()
+        return questions
+    if ranker is not None and len(questions) > 0 and 1 < state.num_candidates() <= endgame.ENDGAME_THRESHOLD:
+        show_endgame(state, questions, ranker)
+    if ranker is not None and ranker.planner is not None and len(questions) > 0:
+        show_plan(state, questions, ranker)
     return questions
 
 
@@ -102,7 +178,13 @@ def qa_list(state: State, question: Question) -> Answer | None:
         lis = input_where("Answer:")
         if lis is None:
             return None
-        return Answer(question.type, tuple(lis))
+        try:
+            answer = Answer(question.type, tuple(lis))
+        except ValueError:
+            continue
+        if state.is_possible_answer(question, answer):
+            return answer
+        print(f"No candidate gives {answer}")
 
 
 def qa_int(state: State, question: Question) -> Answer | None:
@@ -111,15 +193,27 @@ def qa_int(state: State, question: Question) -> Answer | None:
         num = input_int("Answer:")
         if num is None:
             return None
-        return Answer(question.type, num)
+        try:
+            answer = Answer(question.type, num)
+        except ValueError:
+            continue
+        if state.is_possible_answer(question, answer):
+            return answer
+        print(f"No candidate gives {answer}")
 
 
-def qa(state: State, message="", show_all=False) -> tuple[int, Question, Answer] | None:
-    while True:
-        clear_view()
+def qa(
+    state: State, message="", show_all=False, ranker: BackgroundRanker | None = None
+) -> tuple[int, Question, Answer] | None:
+    def render() -> list[Question]:
         show_dashboard(state, message, show_all)
-        questions = show_possible_questions(state)
-        idx = input_int("Which question do you ask?")
+        return show_possible_questions(state, ranker)
+
+    while True:
+        with screen.frame():
+            questions = render()
+        with live(state, render, "Which question do you ask?", ranker):
+            idx = input_int("Which question do you ask?")
         if idx is None:
             return None
         if 0 <= idx < len(questions):
@@ -142,9 +236,9 @@ def qa(state: State, message="", show_all=False) -> tuple[int, Question, Answer]
 
 def add(state: State, message="", show_all=False) -> int | None:
     while True:
-        clear_view()
-        show_dashboard(state, message, show_all)
-        show_question_cards_in_deck(state)
+        with screen.frame():
+            show_dashboard(state, message, show_all)
+            show_question_cards_in_deck(state)
         idx = input_int("which card has been added?")
         if idx is None:
             return None
@@ -154,12 +248,18 @@ def add(state: State, message="", show_all=False) -> int | None:
             continue
 
 
-def opponent(state: State, message="", show_all=False) -> tuple[int, Question, Answer | None] | None:
-    while True:
-        clear_view()
+def opponent(
+    state: State, message="", show_all=False, ranker: BackgroundRanker | None = None
+) -> tuple[int, Question, Answer | None] | None:
+    def render() -> list[Question]:
         show_dashboard(state, message, show_all)
-        questions = show_possible_questions(state)
-        idx = input_int("Which question did the opponent ask?")
+        return show_possible_questions(state, ranker)
+
+    while True:
+        with screen.frame():
+            questions = render()
+        with live(state, render, "Which question did the opponent ask?", ranker):
+            idx = input_int("Which question did the opponent ask?")
         if idx is None:
             return None
         if 0 <= idx < len(questions):
@@ -177,13 +277,63 @@ def opponent(state: State, message="", show_all=False) -> tuple[int, Question, A
         return (idx, question, answer)
 
 
+def submit(state: State, advice: SubmitAdvice, message="", show_all=False) -> None:
+    with screen.frame():
+        show_dashboard(state, message, show_all)
+        print("Most likely hands:")
+        for rank, (hand, probability) in enumerate(advice.top, 1):
+            print(f"    {rank}. {hand!r} {probability:.1%}")
+        print_border()
+        formatted_turns = "{:.3f}".format(advice.expected_turns)
+        print(f"Win probability if you submit now: {advice.win_probability:.1%}")
+        print(f"Expected turns if you keep asking: {formatted_turns} ({advice.source})")
+        print(f"Expected turns of the opponent: {advice.opponent_turns:.3f}")
+        print(f"Win probability if you keep asking: {advice.keep_probability:.1%}")
+        print(f"Advice: {'submit' if advice.should_submit() else 'keep asking'}")
+        print_border()
+    input("Press Enter to go back")
+
+
+def what_if(state: State, message="", show_all=False, ranker: BackgroundRanker | None = None) -> None:
+    def render() -> list[Question]:
+        show_dashboard(state, message, show_all)
+        return show_possible_questions(state, ranker)
+
+    while True:
+        with screen.frame():
+            questions = render()
+        with live(state, render, "Which question do you want to analyze?", ranker):
+            idx = input_int("Which question do you want to analyze?")
+        if idx is None:
+            return
+        if 0 <= idx < len(questions):
+            break
+    question = questions[idx]
+    with screen.frame():
+        show_dashboard(state, message, show_all)
+        print(f"What if {question} is answered:")
+        print_border()
+        for result in state.what_if(question):
+            line = f"{result.answer!r:<24} {result.probability:>6.1%}  candidates {result.state.num_candidates():>5}"
+            if len(result.ranking) > 0:
+                best, entropy = result.ranking[0]
+                line += f"  next {best.colored_question_label()} Ent {entropy:.3f}"
+            print(line)
+        print_border()
+    input("Press Enter to go back")
+
+
 def comma_separated_hands(hands: list[Hand]) -> str:
     return ", ".join(map(repr, hands))
 
 
 def show_all_candidates(state: State):
     hands_per_line = 5
-    separated_hands = [state.candidates[i : i + hands_per_line] for i in range(0, len(state.candidates), hands_per_line)]
+    candidates = state.candidate_hands()
+    separated_hands = [candidates[i : i + hands_per_line] for i in range(0, len(candidates), hands_per_line)]
+    if len(separated_hands) == 0:
+        print("Candidates: []")
+        return
     print("Candidates: [")
     for hands in separated_hands[:-1]:
         print(" " * 4 + comma_separated_hands(hands) + ",")
@@ -191,6 +341,14 @@ def show_all_candidates(state: State):
     print("]")
 
 
+def show_timings():
+    print("Timings (count, total ms, last ms):")
+    for name, timing in sorted(profiling.timings.items()):
+        print(f"    {name.ljust(12)} {timing.count:>7} {timing.total * 1000:>10.1f} {timing.last * 1000:>9.2f}")
+    print_border()
+
+
+@profiling.timed("dashboard")
 def show_dashboard(state: State, message="", show_all=False):
     # Your hand section
     print(f"Your hand: {state.hand}")
@@ -202,14 +360,22 @@ def show_dashboard(state: State, message="", show_all=False):
         print(f"!! {message}")
         print_border()
     # Candidates of opponent's hand section
-    print(f"Current candidates: {len(state.candidates)}")
-    if len(state.candidates) <= 10 or show_all:
+    print(f"Current candidates: {state.num_candidates()}")
+    if state.num_candidates() <= 10 or show_all:
         show_all_candidates(state)
+    if state.num_candidates() > 0:
+        print(f"Win probability if you submit now: {state.most_likely(1)[0][1]:.1%}")
+    print_border()
+    # Candidates of your hand from the opponent's view section
+    formatted_opponent = "{:.1f}".format(state.num_opponent_candidates)
+    print(f"Opponent's candidates of your hand: {formatted_opponent} on average")
     print_border()
+    if profiling.ENABLED:
+        show_timings()
 
 
 def input_command(state: State, message="", show_all=False):
-    clear_view()
-    show_dashboard(state, message, show_all)
-    print("`q[uestion]` / `a[dd]` / `o[pponent]` / `s[ubmit]` / `show_all` / `undo`")
+    with screen.frame():
+        show_dashboard(state, message, show_all)
+        print("`q[uestion]` / `a[dd]` / `o[pponent]` / `s[ubmit]` / `what_if` / `show_all` / `plan` / `deck` / `undo` / `redo`")
     return input("$ ")
@@ -0,0 +1,191 @@
+import argparse
+import functools
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any
+
+import init_phase
+import profiling
+import vectorized
+from qanda import QuestionCard, QuestionCardId, encode_answer_value
+from utility import FIVES_MASK, NUM_TILES, Hand, iter_bits, to_bitset
+
+"""
+`Universe` is every distinct hand of 5 tiles out of all 20 tiles, with the encoded answer of every question.
+It does not depend on my hand, so it is computed once, written to `universe.bin` by a build step,
+and memory-mapped at runtime without copying:
+
+    $ poetry run python universe.py build
+
+The candidates of a game are the hands disjoint from my hand, selected with bitsets (see `AnswerTable`).
+Without the file, the universe is computed in memory on first use.
+"""
+
+UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "universe.bin")
+MAGIC = b"TAGUNIV\0"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIII")  # magic, version, number of hands, number of questions
+QUESTION = struct.Struct("<24sbB")  # question card id, option (-1 for None), number of answer codes
+
+QuestionKey = tuple[QuestionCardId, int | None]
+
+
+def all_question_cards() -> list[QuestionCard]:
+    # the texts are not needed to calculate answers
+    return [QuestionCard(qcid, "", "") for qcid in QuestionCardId]
+
+
+def all_hand_masks() -> list[int]:
+    all_tiles = [(idx, 1) for idx in range(NUM_TILES) if idx // 2 != 5] + [(10, 2)]
+    return list(init_phase.enumerate_hands(all_tiles))
+
+
+class Universe:
+    def __init__(
+        self,
+        masks: Any,
+        columns: dict[QuestionKey, Any],
+        index: dict[QuestionKey, dict[int, int]],
+        with_tile: list[int],
+    ):
+        # `masks` and `columns` are arrays or (memory-mapped) memoryviews
+        self.masks = masks
+        self.columns = columns
+        self.index = index
+        # `with_tile[t]` is the bitset of hands containing tile `t`; a single green 5 is tile 10
+        self.with_tile = with_tile
+        self.all = (1 << len(masks)) - 1
+
+    def __len__(self):
+        return len(self.masks)
+
+    def __reduce__(self):
+        # worker processes load their own (memory-mapped) copy
+        return (get_universe, ())
+
+    @functools.cached_property
+    def positions(self) -> dict[int, int]:
+        """Index of each hand mask in `masks`"""
+        return {mask: idx for idx, mask in enumerate(self.masks)}
+
+    def disjoint_from(self, hand_mask: int) -> int:
+        """Bitset of the hands which can be held together with the hand"""
+        fives = (hand_mask >> 10 & 0b11).bit_count()
+        excluded = 0
+        for t in iter_bits(hand_mask & ~FIVES_MASK):
+            excluded |= self.with_tile[t]
+        if fives >= 1:
+            excluded |= self.with_tile[11]
+        if fives == 2:
+            excluded |= self.with_tile[10]
+        return self.all & ~excluded
+
+    @classmethod
+    def compute(cls):
+        masks = all_hand_masks()
+        columns: dict[QuestionKey, Any] = dict()
+        if vectorized.available():
+            nums, colors = vectorized.hand_arrays(masks)
+        hands: list[Hand] | None = None
+        for card in all_question_cards():
+            for question in card.to_questions():
+                if vectorized.available() and vectorized.has_kernel(question):
+                    columns[question.key()] = vectorized.answer_codes(question, nums, colors)
+                    continue
+                if hands is None:
+                    hands = list(map(Hand.from_mask, masks))
+                columns[question.key()] = bytes(map(encode_answer_value, question.ask_many(hands)))
+        index: dict[QuestionKey, dict[int, int]] = dict()
+        for key, column in columns.items():
+            groups: dict[int, list[int]] = dict()
+            for idx, code in enumerate(column):
+                groups.setdefault(code, []).append(idx)
+            index[key] = {code: to_bitset(group) for code, group in sorted(groups.items())}
+        with_tile = [to_bitset(idx for idx, mask in enumerate(masks) if mask >> t & 1) for t in range(NUM_TILES)]
+        return cls(array("I", masks), columns, index, with_tile)
+
+    @classmethod
+    def load(cls, path: str = UNIVERSE_PATH):
+        with open(path, "rb") as f:
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        magic, version, num_hands, num_questions = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"unsupported universe file: {path}")
+        bitmap_size = (num_hands + 7) // 8
+        offset = HEADER.size
+        question_keys: list[tuple[QuestionKey, int]] = []
+        for _ in range(num_questions):
+            qcid, option, num_codes = QUESTION.unpack_from(buffer, offset)
+            offset += QUESTION.size
+            question_keys.append(((QuestionCardId(qcid.rstrip(b"\0").decode()), None if option < 0 else option), num_codes))
+        masks = buffer[offset : offset + 4 * num_hands].cast("I")
+        offset += 4 * num_hands
+        columns: dict[QuestionKey, Any] = dict()
+        for key, _ in question_keys:
+            columns[key] = buffer[offset : offset + num_hands]
+            offset += num_hands
+        index: dict[QuestionKey, dict[int, int]] = dict()
+        for key, num_codes in question_keys:
+            codes = buffer[offset : offset + num_codes].tolist()
+            offset += num_codes
+            index[key] = dict()
+            for code in codes:
+                index[key][code] = int.from_bytes(buffer[offset : offset + bitmap_size], "little")
+                offset += bitmap_size
+        with_tile = []
+        for _ in range(NUM_TILES):
+            with_tile.append(int.from_bytes(buffer[offset : offset + bitmap_size], "little"))
+            offset += bitmap_size
+        return cls(masks, columns, index, with_tile)
+
+    def write(self, path: str = UNIVERSE_PATH) -> None:
+        bitmap_size = (len(self) + 7) // 8
+        with open(path + ".tmp", "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self), len(self.columns)))
+            for (qcid, option), codes in self.index.items():
+                f.write(QUESTION.pack(qcid.value.encode(), -1 if option is None else option, len(codes)))
+            f.write(array("I", self.masks).tobytes())
+            for column in self.columns.values():
+                f.write(bytes(column))
+            for codes in self.index.values():
+                f.write(bytes(codes.keys()))
+                for bits in codes.values():
+                    f.write(bits.to_bytes(bitmap_size, "little"))
+            for bits in self.with_tile:
+                f.write(bits.to_bytes(bitmap_size, "little"))
+        os.replace(path + ".tmp", path)
+
+
+_universe: Universe | None = None
+
+
+@profiling.timed("universe")
+def get_universe() -> Universe:
+    """The universe of this process, loaded from `universe.bin` if it is available and up to date"""
+    global _universe
+    if _universe is None:
+        try:
+            _universe = Universe.load()
+        except (OSError, ValueError):
+            _universe = Universe.compute()
+    return _universe
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="universe.py", description="Universe of all hands and their answers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="compute the universe and write it to a file")
+    build_parser.add_argument("--output", default=UNIVERSE_PATH)
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        universe = Universe.compute()
+        universe.write(args.output)
+        print(f"Wrote {len(universe)} hands and {len(universe.columns)} questions to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,6 +2,9 @@ import functools
 import math
 import unicodedata
 from enum import Enum
+from typing import Iterable, Iterator
+
+import profiling
 
 
 class Color(Enum):
@@ -16,11 +19,33 @@ class Color(Enum):
         return self.value == other.value
 
 
+"""
+Tiles and hands also have a packed integer form.
+Each tile is an index in 0-19 (`num * 2`, plus 1 for blue); both green 5s share the index pair 10-11.
+A hand is a 20-bit mask of its tile indices. A single 5 always takes bit 10, so masks are canonical.
+"""
+
+NUM_TILES = 20
+FIVES_MASK = 0b11 << 10
+
+
 class Tile:
+    __slots__ = ("num", "color")
+
     def __init__(self, num: int, color: Color):
         self.num = num
         self.color = color
 
+    @classmethod
+    def from_index(cls, idx: int):
+        num = idx // 2
+        if num == 5:
+            return cls(num, Color.GREEN)
+        return cls(num, Color.BLUE if idx % 2 else Color.RED)
+
+    def index(self) -> int:
+        return self.num * 2 + (1 if self.color == Color.BLUE else 0)
+
     def __lt__(self, other):
         if self.num == other.num:
             return self.color < other.color
@@ -29,6 +54,9 @@ class Tile:
     def __eq__(self, other):
         return self.num == other.num and self.color == other.color
 
+    def __hash__(self):
+        return self.index()
+
     def __repr__(self):
         return f"Tile<{self.num}, {self.color}>"
 
@@ -43,18 +71,61 @@ class Tile:
         return escape_sequence + str(self.num) + "\033[39m"
 
 
+def tiles_to_mask(tiles) -> int:
+    mask = 0
+    for tile in tiles:
+        bit = tile.index()
+        if mask >> bit & 1:
+            # the second green 5
+            bit += 1
+        mask |= 1 << bit
+    return mask
+
+
 class Hand:
+    __slots__ = ("tiles",)
+
     def __init__(self, tiles: list[Tile]):
         self.tiles = tiles[:5]
         self.sort()
 
+    @classmethod
+    def from_mask(cls, mask: int):
+        return cls([Tile.from_index(idx) for idx in range(NUM_TILES) if mask >> idx & 1])
+
     def sort(self):
         self.tiles.sort()
 
+    def mask(self) -> int:
+        return tiles_to_mask(self.tiles)
+
+    def __eq__(self, other):
+        return self.mask() == other.mask()
+
+    def __hash__(self):
+        return self.mask()
+
     def __repr__(self):
         return f"Hand<{' '.join(map(str, self.tiles))}>"
 
 
+def iter_bits(bits: int) -> Iterator[int]:
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def to_bitset(indices: Iterable[int]) -> int:
+    bitmap = bytearray(0)
+    for idx in indices:
+        if len(bitmap) <= idx // 8:
+            bitmap.extend(bytes(idx // 8 + 1 - len(bitmap)))
+        bitmap[idx // 8] |= 1 << (idx % 8)
+    return int.from_bytes(bitmap, "little")
+
+
+@profiling.timed("entropy")
 def calc_entropy(cases: list[int]) -> float:
     s = sum(cases)
     return sum(map(lambda num: math.log2(s / num) * num, cases)) / s
@@ -108,8 +179,12 @@ def entire_east_asian_width(colored_str: str):
 
 def ljust_east_asian(s: str, width: int, c: str = " "):
     assert c == " "
-    num_added = max(0, width - entire_east_asian_width(s))
-    return s + (c * num_added)
+    return ljust_by_width(s, entire_east_asian_width(s), width)
+
+
+def ljust_by_width(s: str, s_width: int, width: int):
+    """Same as `ljust_east_asian` for a string whose width is known"""
+    return s + " " * max(0, width - s_width)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+import functools
+from typing import Any, Callable
+
+from qanda import Question, QuestionCardId
+from utility import NUM_TILES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+"""
+Optional NumPy backend answering a question for all candidates at once.
+Candidates are held as an (N, 5) array of numbers and an (N, 5) array of colors,
+and each `vca_*` function is the vectorized equivalent of the `ca_*` function in `qanda`.
+Answers are encoded like `qanda.encode_answer_value`; WHERE answers are position bitmasks.
+When NumPy is not installed, `available()` is False and callers use `Question.ask_many` instead.
+"""
+
+RED, BLUE, GREEN = 0, 1, 2
+
+
+def available() -> bool:
+    return np is not None
+
+
+def hand_arrays(masks) -> tuple[Any, Any]:
+    assert np is not None
+    bits = (np.asarray(masks, dtype=np.uint32)[:, None] >> np.arange(NUM_TILES, dtype=np.uint32)) & 1
+    # indices of the 5 set bits of each mask, in ascending order
+    tile_indices = np.nonzero(bits)[1].reshape(-1, 5)
+    nums = tile_indices // 2
+    colors = np.where(nums == 5, GREEN, tile_indices % 2)
+    return nums, colors
+
+
+def position_mask(flags):
+    return flags @ (1 << np.arange(flags.shape[1]))
+
+
+def vca_where_x(nums, colors, x: int):
+    return position_mask(nums == x)
+
+
+def vca_where_sequential(nums, colors):
+    return position_mask(nums[:, :4] + 1 == nums[:, 1:])
+
+
+def vca_where_neighboring_same_color(nums, colors):
+    return position_mask(colors[:, :4] == colors[:, 1:])
+
+
+def vca_count_even_odd(nums, colors, odd: bool = False):
+    return (nums % 2 == (1 if odd else 0)).sum(axis=1)
+
+
+def vca_count_red_blue(nums, colors, blue: bool = False):
+    return (colors == (BLUE if blue else RED)).sum(axis=1)
+
+
+def vca_count_pairs(nums, colors):
+    # each number has at most two tiles, and tiles are sorted
+    return (nums[:, :4] == nums[:, 1:]).sum(axis=1)
+
+
+def vca_sum_3_x(nums, colors, start: int = 0, count: int = 3):
+    return nums[:, start : start + count].sum(axis=1)
+
+
+def vca_sum_red_blue(nums, colors, blue: bool = False):
+    return (nums * (colors == (BLUE if blue else RED))).sum(axis=1)
+
+
+def vca_shared_sum_all(nums, colors):
+    return nums.sum(axis=1)
+
+
+def vca_shared_center_45(nums, colors):
+    return np.where(nums[:, 2] >= 5, 5, 4)
+
+
+def vca_shared_diff_min_max(nums, colors):
+    return nums[:, 4] - nums[:, 0]
+
+
+VectorKernel = Callable[[Any, Any], Any]
+
+_vector_kernels: dict[QuestionCardId, Callable[[int | None], VectorKernel]] = {
+    QuestionCardId.WHERE_0: lambda _: functools.partial(vca_where_x, x=0),
+    QuestionCardId.WHERE_12: lambda option: functools.partial(vca_where_x, x=option),
+    QuestionCardId.WHERE_34: lambda option: functools.partial(vca_where_x, x=option),
+    QuestionCardId.WHERE_5: lambda _: functools.partial(vca_where_x, x=5),
+    QuestionCardId.WHERE_67: lambda option: functools.partial(vca_where_x, x=option),
+    QuestionCardId.WHERE_89: lambda option: functools.partial(vca_where_x, x=option),
+    QuestionCardId.WHERE_SEQUENTIAL: lambda _: vca_where_sequential,
+    QuestionCardId.WHERE_NEIGHBORING_SAME_COLOR: lambda _: vca_where_neighboring_same_color,
+    QuestionCardId.COUNT_EVEN: lambda _: vca_count_even_odd,
+    QuestionCardId.COUNT_ODD: lambda _: functools.partial(vca_count_even_odd, odd=True),
+    QuestionCardId.COUNT_RED: lambda _: vca_count_red_blue,
+    QuestionCardId.COUNT_BLUE: lambda _: functools.partial(vca_count_red_blue, blue=True),
+    QuestionCardId.COUNT_PAIRS: lambda _: vca_count_pairs,
+    QuestionCardId.SUM_3_LEFT: lambda _: vca_sum_3_x,
+    QuestionCardId.SUM_3_MIDDLE: lambda _: functools.partial(vca_sum_3_x, start=1),
+    QuestionCardId.SUM_3_RIGHT: lambda _: functools.partial(vca_sum_3_x, start=2),
+    QuestionCardId.SUM_RED: lambda _: vca_sum_red_blue,
+    QuestionCardId.SUM_BLUE: lambda _: functools.partial(vca_sum_red_blue, blue=True),
+    QuestionCardId.SHARED_SUM_ALL: lambda _: vca_shared_sum_all,
+    QuestionCardId.SHARED_CENTER_45: lambda _: vca_shared_center_45,
+    QuestionCardId.SHARED_DIFF_MIN_MAX: lambda _: vca_shared_diff_min_max,
+}
+
+
+def has_kernel(question: Question) -> bool:
+    return question.question_card.id in _vector_kernels
+
+
+def answer_codes(question: Question, nums, colors) -> bytes:
+    kernel = _vector_kernels[question.question_card.id](question.option)
+    return kernel(nums, colors).astype(np.uint8).tobytes()